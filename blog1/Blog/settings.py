@@ -88,6 +88,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# The sidebar/page caches are invalidated by bumping version keys, so in
+# production every worker must share one cache (Redis or Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog1',
+    }
+}
+
+
+# Keep each user's group names in their session (see users/roles.py).
+# Only turn this on with a shared cache: the role versions that expire the
+# session copy live in the cache, and with LocMemCache a role removed in one
+# worker would keep working in the others.
+USER_ROLES_SESSION_CACHE = False
+
+
+# Manager dashboard totals: False reads the signal-maintained counters,
+# True always runs COUNT(*) (the dashboard also accepts ?exact=1)
+DASHBOARD_EXACT_COUNTS = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -128,9 +153,47 @@ STATICFILES_DIRS = [
     'Blog/static',
 ]
 
+# collectstatic writes content-hashed names plus .gz/.br copies (bloggss/staticfiles.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'bloggss.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Blog image derivatives (bloggss/images.py): "process", "sync" or "off"
+BLOG_IMAGE_PIPELINE = 'process'
+BLOG_IMAGE_WORKERS = 2
+BLOG_IMAGE_WIDTHS = (480, 960, 1440)
+
+# Serve home, search, category and single post pages with the async views.
+# Turn on when running under ASGI (Blog/asgi.py), under WSGI every async
+# view would need its own event loop.
+BLOG_ASYNC_VIEWS = False
+
+# Posts per child sitemap (by id range, see bloggss/sitemaps.py)
+SITEMAP_CHUNK_SIZE = 5000
+
+# Post view counts are buffered per worker and written every N hits or
+# N seconds, whichever comes first (bloggss/hits.py)
+BLOG_VIEWS_FLUSH_HITS = 100
+BLOG_VIEWS_FLUSH_INTERVAL = 10
+
+# Admin changelist for big blog tables: estimated counts, ?after=<id> paging
+# and an id / title prefix search (bloggss/admin.py). False = stock admin.
+BLOG_ADMIN_SCALABLE = True
+
+# How /media/ uploads are sent (bloggss/media.py): "django" (Range and
+# conditional GET support, sendfile() under gunicorn), "x-accel" (nginx),
+# "x-sendfile" (Apache/lighttpd) or "off" (the front server maps /media/).
+BLOG_MEDIA_SERVING = 'django'
+BLOG_MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Let Django answer STATIC_URL from STATIC_ROOT (precompressed, immutable
+# caching for hashed names). Turn off when the front server serves /static/.
+BLOG_SERVE_STATIC = True
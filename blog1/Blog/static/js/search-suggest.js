@@ -0,0 +1,25 @@
+// search box suggestions (titles + categories) from /search/suggest/
+(function () {
+    const input = document.querySelector('.search-input');
+    const list = document.getElementById('search-suggestions');
+    if (!input || !list) return;
+    let timer;
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        const q = input.value.trim();
+        if (q.length < 2) { list.innerHTML = ''; return; }
+        timer = setTimeout(function () {
+            fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(q))
+                .then(function (r) { return r.json(); })
+                .then(function (data) {
+                    list.innerHTML = '';
+                    data.results.forEach(function (item) {
+                        const option = document.createElement('option');
+                        option.value = item.label;
+                        list.appendChild(option);
+                    });
+                })
+                .catch(function () {});
+        }, 120);
+    });
+})();
@@ -18,11 +18,20 @@ from django.contrib import admin
 from django.urls import include, path
 from . import views
 from django.conf import settings
-from django.conf.urls.static import static
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('', views.home, name='home'),
-    path('', include('bloggss.urls')),
-    path('', include('users.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+from bloggss import urls as bloggss_urls
+from bloggss.media import media_urlpatterns
+from bloggss.staticfiles import static_urlpatterns
+
+
+def get_urlpatterns(use_async):
+    """use_async switches home and the bloggss read views to their async versions"""
+    return [
+        path('admin/', admin.site.urls),
+        path('', views.ahome if use_async else views.home, name='home'),
+        path('', include(bloggss_urls.get_urlpatterns(use_async))),
+        path('', include('users.urls')),
+    ] + media_urlpatterns() + static_urlpatterns()  # see bloggss/media.py, bloggss/staticfiles.py
+
+
+urlpatterns = get_urlpatterns(settings.BLOG_ASYNC_VIEWS)
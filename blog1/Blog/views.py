@@ -2,41 +2,106 @@ from multiprocessing import context
 from django.urls import reverse
 from django.shortcuts import render, get_object_or_404, redirect
 from bloggss.models import Blog, Category  # your Blog and Category models
-from django.db.models import Q
+from bloggss.search import asearch_blogs, search_blogs
+from bloggss.pagination import aget_page, akeyset_paginate, keyset_paginate
+from bloggss.context_processors import acontext
+from bloggss.slugs import save_with_unique_slug
+from bloggss import autocomplete, category_counts, counters, hits, images, moderation, page_cache, stats
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from users.decorators import group_required
+from users.roles import get_roles
 from .form import BlogForm, CategoryForm
-from django.utils.text import slugify
-from django.utils.timezone import now
-from datetime import timedelta
+from django.db import transaction
 from django.db.models import Count
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, User
 
+SEARCH_RESULTS_PER_PAGE = 10
+POSTS_PER_PAGE = 10
 
 
+@page_cache.swr_cache_page('home', fresh_for=60, params=('cursor',))  # anonymous visitors only
 def home(request):
     """ Logic for the home page"""
 
-    featured_posts = Blog.objects.filter(is_featured=True, status='published').order_by('-updated_at')
-    blogs = Blog.objects.filter(status='published', is_featured=False).order_by('-updated_at')
+    featured_posts = Blog.objects.listing().published().filter(is_featured=True).order_by('-updated_at')
+
+    # cursor pagination on (updated_at, id) so deep pages don't need OFFSET
+    page = keyset_paginate(
+        Blog.objects.listing().published().filter(is_featured=False),
+        request.GET.get('cursor'),
+        POSTS_PER_PAGE,
+    )
     context = {
         'featured_posts': featured_posts,
-        'blogs': blogs,
+        'blogs': page.object_list,
+        'page': page,
     }
 
     return render(request, 'home.html', context)
 
 
+@page_cache.swr_cache_page('home', fresh_for=60, params=('cursor',))
+async def ahome(request):
+    """ Async home page, used when BLOG_ASYNC_VIEWS is on (see Blog/urls.py)"""
+    featured_posts = [
+        blog async for blog in
+        Blog.objects.listing().published().filter(is_featured=True).order_by('-updated_at').aiterator()
+    ]
+    page = await akeyset_paginate(
+        Blog.objects.listing().published().filter(is_featured=False),
+        request.GET.get('cursor'),
+        POSTS_PER_PAGE,
+    )
+    context = await acontext(request)
+    context.update({
+        'featured_posts': featured_posts,
+        'blogs': page.object_list,
+        'page': page,
+    })
+    return render(request, 'home.html', context)
+
+
 def search(request):
-    keyword = request.GET.get('keyword')
-    blogs = Blog.objects.filter(Q(title__icontains=keyword) | Q(short_desc__icontains=keyword) | Q(content__icontains=keyword)).order_by('-updated_at')
+    keyword = request.GET.get('keyword', '').strip()
+
+    # FTS5 index on SQLite (ranked + highlighted), icontains query elsewhere
+    results = search_blogs(keyword)
+    page_obj = Paginator(results, SEARCH_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
 
     context = {
         'keyword': keyword,
-        'blogs' : blogs,
+        'blogs' : page_obj,
+        'page_obj': page_obj,
     }
     return render(request, 'search.html', context)
 
+
+async def asearch(request):
+    keyword = request.GET.get('keyword', '').strip()
+
+    results = await asearch_blogs(keyword)
+    page_obj = await aget_page(results, SEARCH_RESULTS_PER_PAGE, request.GET.get('page'))
+
+    context = await acontext(request)
+    context.update({
+        'keyword': keyword,
+        'blogs' : page_obj,
+        'page_obj': page_obj,
+    })
+    return render(request, 'search.html', context)
+
+
+def search_suggest(request):
+    """Autocomplete for the search box, answered from memory (bloggss/autocomplete.py)."""
+    results = autocomplete.suggest(request.GET.get('q', ''))
+    response = JsonResponse({'results': results})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
 #post CRUD views will be in users/views.py since they are only for authenticated users/im using here cos the users view is clustered 
 
 
@@ -46,10 +111,10 @@ def search(request):
 
 @login_required
 def posts_list(request):
-    if request.user.groups.filter(name="Manager").exists():
-        posts = Blog.objects.all()
+    if "Manager" in get_roles(request.user, request):
+        posts = Blog.objects.listing()
     else:
-        posts = Blog.objects.filter(author=request.user)
+        posts = Blog.objects.listing().filter(author=request.user)
 
     context = {
         'posts': posts
@@ -64,7 +129,8 @@ def posts_list(request):
 @login_required
 @group_required("Manager", "Editor")  # only Managers and Editors
 def posts_list(request):
-    blogs = Blog.objects.all().order_by('-updated_at')  # fetch all blogs ordered by updated_at descending
+    hits.try_flush()  # so the view counts include this worker's buffered hits
+    blogs = Blog.objects.listing().order_by('-updated_at')  # fetch all blogs ordered by updated_at descending
     context = {"blogs": blogs}
     return render(request, "users/dashboard/posts_list.html", context)
 
@@ -72,6 +138,7 @@ def posts_list(request):
 
 @login_required
 @group_required("Manager", "Editor")  # adjust role if needed
+@transaction.atomic  # the post and the dashboard counter commit together
 def post_create(request):
     if request.method == "POST":
         form = BlogForm(request.POST, request.FILES)
@@ -82,11 +149,11 @@ def post_create(request):
             # Assign author automatically
             blog.author = request.user
 
-            blog.save()  # Save first to generate ID
+            # slug is picked before the INSERT, so this is a single write
+            save_with_unique_slug(blog)
 
-            # Generate unique slug using ID
-            blog.slug = slugify(blog.title) + "-" + str(blog.id)
-            blog.save()
+            # thumbnails + WebP copies are made in the background
+            images.schedule(blog)
 
             return redirect("posts_list")
         else:
@@ -115,9 +182,12 @@ def post_update(request, pk):
 
             # Optional: regenerate slug if title changed
             if "title" in form.changed_data:
-                updated_blog.slug = slugify(updated_blog.title) + "-" + str(updated_blog.id)
+                save_with_unique_slug(updated_blog)
+            else:
+                updated_blog.save()
 
-            updated_blog.save()
+            if "blog_image" in form.changed_data:
+                images.schedule(updated_blog)
 
             return redirect("posts_list")
     else:
@@ -131,43 +201,69 @@ def post_update(request, pk):
     return render(request, "users/dashboard/posts_update.html", context)
 
 
+@transaction.atomic
 def post_delete(request, pk):
     post = get_object_or_404(Blog, pk=pk)
     post.delete()
     return redirect('posts_list')
 
 
+@login_required
+@group_required("Manager", "Editor")  # same people who can edit/delete one post
+@require_POST
+def posts_bulk_action(request):
+    """Publish/unpublish/feature/unfeature/delete the ticked posts in one go."""
+    action = request.POST.get("action")
+    # isdecimal(): isdigit() lets '²' through to int()
+    ids = [int(pk) for pk in request.POST.getlist("selected") if pk.isdecimal() and len(pk) <= 18]
+
+    if action not in moderation.ACTIONS or not ids:
+        messages.error(request, "Pick at least one post and an action.")
+        return redirect("posts_list")
+
+    changed = moderation.apply(action, ids)  # one UPDATE/DELETE for all of them
+    messages.success(request, f"{action.capitalize()}: {changed} post{'s' if changed != 1 else ''} changed.")
+    return redirect("posts_list")
+
+
 @login_required
 @group_required("Manager", "Editor")  # only Managers and Editors
 def system_reports(request):
     # ----- Summary Stats -----
-    total_blogs = Blog.objects.count()
+    # Nothing here reads the whole Blog table: post counts come from the
+    # BlogDailyStats rollup, the rest from counters and cached category counts
+    total_blogs, blogs_this_month, published_blogs = stats.summary(recent_days=30)
     recent_blogs = Blog.objects.order_by("-created_at")[:5]
 
-    one_month_ago = now() - timedelta(days=30)
-    blogs_this_month = Blog.objects.filter(created_at__gte=one_month_ago).count()
-
-    total_users = User.objects.count()
-    total_managers = User.objects.filter(groups__name="Manager").count()
-    total_editors = User.objects.filter(groups__name="Editor").count()
-    total_authors = User.objects.filter(groups__name="Author").count()
-
-    most_active_author = (
-        Blog.objects.values("author__username")
-        .annotate(post_count=Count("id"))
-        .order_by("-post_count")
-        .first()
+    total_users = counters.get_counts(counters.USERS)[counters.USERS]
+    members = dict(
+        Group.objects.filter(name__in=["Manager", "Editor", "Author"])
+        .annotate(members=Count("user"))
+        .values_list("name", "members")
     )
+    total_managers = members.get("Manager", 0)
+    total_editors = members.get("Editor", 0)
+    total_authors = members.get("Author", 0)
+
+    most_active_author = None
+    top = counters.top_author()  # the per-author post counters
+    if top:
+        author_id, post_count = top
+        most_active_author = {
+            "author__username": User.objects.filter(pk=author_id).values_list("username", flat=True).first(),
+            "post_count": post_count,
+        }
 
     # ----- Chart Data -----
-    # 1. Blogs per Category
-    blogs_per_category = (
-        Blog.objects.values("category__category_name")
-        .annotate(count=Count("id"))
-        .order_by("-count")
+    # 1. Published blogs per Category - the sidebar's cached counts
+    category_names = dict(Category.objects.values_list("pk", "category_name"))
+    blogs_per_category = sorted(
+        ((category_names[pk], count)
+         for pk, count in category_counts.get_counts(list(category_names)).items() if count),
+        key=lambda item: -item[1],
     )
-    category_labels = [b["category__category_name"] for b in blogs_per_category]
-    category_counts = [b["count"] for b in blogs_per_category]
+    category_labels = [name for name, _ in blogs_per_category]
+    category_data = [count for _, count in blogs_per_category]
 
     # 2. Role Distribution
     role_counts = {
@@ -178,20 +274,15 @@ def system_reports(request):
     role_labels = list(role_counts.keys())
     role_data = list(role_counts.values())
 
-    # 3. Monthly Blog Growth (last 6 months)
-    monthly_labels = []
-    monthly_data = []
-    for i in range(5, -1, -1):  # last 6 months
-        month = now() - timedelta(days=i*30)
-        monthly_labels.append(month.strftime("%b %Y"))
-        count = Blog.objects.filter(
-            created_at__year=month.year, created_at__month=month.month
-        ).count()
-        monthly_data.append(count)
+    # 3. Monthly Blog Growth (last 6 months) - one TruncMonth query on the rollup
+    monthly = stats.monthly_counts(months=6)
+    monthly_labels = [month.strftime("%b %Y") for month, _ in monthly]
+    monthly_data = [count for _, count in monthly]
 
     context = {
         "total_blogs": total_blogs,
         "blogs_this_month": blogs_this_month,
+        "published_blogs": published_blogs,
         "recent_blogs": recent_blogs,
         "total_users": total_users,
         "total_managers": total_managers,
@@ -199,7 +290,7 @@ def system_reports(request):
         "total_authors": total_authors,
         "most_active_author": most_active_author,
         "category_labels": category_labels,
-        "category_counts": category_counts,
+        "category_counts": category_data,
         "role_labels": role_labels,
         "role_data": role_data,
         "monthly_labels": monthly_labels,
@@ -214,11 +305,12 @@ def system_reports(request):
 @group_required("Manager", "Editor")
 def category_list(request):
     categories = Category.objects.all().order_by("category_name")
+    roles = get_roles(request.user, request)
     
-    if request.user.groups.filter(name="Manager").exists():
+    if "Manager" in roles:
         dashboard_url = reverse("manager_dashboard")
 
-    elif request.user.groups.filter(name="Editor").exists():
+    elif "Editor" in roles:
         dashboard_url = reverse("editor_dashboard")
 
 
@@ -229,6 +321,7 @@ def category_list(request):
 
 @login_required
 @group_required("Manager", "Editor")
+@transaction.atomic
 def category_create(request):
     if request.method == "POST":
         form = CategoryForm(request.POST)
@@ -271,6 +364,7 @@ def category_update(request, pk):
 
 @login_required
 @group_required("Manager")
+@transaction.atomic
 def category_delete(request, pk):
     category = get_object_or_404(Category, pk=pk)
 
@@ -1,14 +1,146 @@
+import sys
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+
+from . import counters
 from .models import Category, Blog
 
 # Register your models here.
 
+# Past this many matches a filtered changelist just says "10000+"
+COUNT_LIMIT = 10000
+CURSOR_VAR = 'after'
+
+
+def scalable_admin():
+    """BLOG_ADMIN_SCALABLE: the changelist mode for big tables (see BlogAdmin)."""
+    return getattr(settings, 'BLOG_ADMIN_SCALABLE', True)
+
+
+def title_prefix(prefix):
+    """
+    Titles starting with `prefix` (any case) as a range on the lower(title)
+    index. Needs .alias(title_lower=Lower('title')) on the queryset.
+    """
+    prefix = prefix.lower()
+    # the last character that can still be bumped: nothing sorts above U+10FFFF
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return Q(title_lower__gte=prefix)
+    upper = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return Q(title_lower__gte=prefix, title_lower__lt=upper)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Never COUNTs the whole table: the unfiltered total comes from the blogs
+    counter (counters.py) and a filtered one stops counting at COUNT_LIMIT.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return counters.get_counts(counters.BLOGS)[counters.BLOGS]
+        capped = self.object_list.order_by().values('pk')[:COUNT_LIMIT + 1].count()
+        if capped > COUNT_LIMIT:
+            self.estimated = True
+            return COUNT_LIMIT
+        return capped
+
+
+class BlogChangeList(ChangeList):
+    """
+    Pages the default "newest id first" order with an ?after=<id> cursor
+    instead of ?p=<n>, so the last page costs the same as the first.
+    Sorting by a column goes back to numbered pages.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # a new filter/sort/search starts from the first page again
+        return super().get_query_string(new_params, [CURSOR_VAR] + list(remove or []))
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.cursor = self.next_cursor = None
+        self.keyset = set(self.queryset.query.order_by) == {'-pk'} and not self.show_all
+        if not self.keyset:
+            return
+
+        queryset = self.queryset
+        try:
+            self.cursor = int(request.GET[CURSOR_VAR])
+            queryset = queryset.filter(pk__lt=self.cursor)
+        except (KeyError, ValueError):
+            pass
+        self.result_list = queryset[:self.list_per_page]
+        rows = list(self.result_list)  # fills the cache the formset reuses
+        if len(rows) == self.list_per_page and queryset.filter(pk__lt=rows[-1].pk).exists():
+            self.next_cursor = rows[-1].pk
+        self.multi_page = bool(self.cursor or self.next_cursor)
+        self.first_page_url = self.get_query_string()
+        if self.next_cursor:
+            self.next_page_url = self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
 class BlogAdmin(admin.ModelAdmin):
+    """
+    With BLOG_ADMIN_SCALABLE (the default) the changelist is built for
+    hundreds of thousands of posts: estimated counts, keyset paging and a
+    post id / title prefix search on an index instead of LIKE '%...%' over
+    a join. Turn it off to get the stock admin behaviour back.
+    """
     prepopulated_fields = {"slug": ("title",)}
     list_display=('title', 'category', 'author', 'status', 'is_featured', 'created_at')
     list_editable = ('status', 'is_featured')
+    list_select_related = ('category', 'author')
+    list_filter = ('status', 'is_featured', 'category')
     search_fields = ('id', 'title', 'category__category_name', 'status')
+    ordering = ('-pk',)
+
+    @property
+    def show_full_result_count(self):
+        return not scalable_admin()
+
+    @property
+    def search_help_text(self):
+        return "Post id, or the start of the title." if scalable_admin() else None
+
+    def get_changelist(self, request, **kwargs):
+        return BlogChangeList if scalable_admin() else super().get_changelist(request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if scalable_admin():
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not scalable_admin():
+            return super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if not term.isascii():
+            # SQLite's LOWER() only folds ASCII, so lower(title) can't be
+            # matched against other letters: use the stock LIKE search
+            return super().get_search_results(request, queryset, search_term)
+        matches = title_prefix(term)
+        # isdigit() also takes '²', which int() rejects; 18 digits fit a bigint
+        if term.isdecimal() and len(term) <= 18:
+            matches |= Q(pk=int(term))
+        return queryset.alias(title_lower=Lower('title')).filter(matches), False
 
 
 admin.site.register(Category)
-admin.site.register(Blog, BlogAdmin)
\ No newline at end of file
+admin.site.register(Blog, BlogAdmin)
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BloggssConfig(AppConfig):
     name = 'bloggss'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import restore_triggers
+
+        post_migrate.connect(restore_triggers, sender=self)
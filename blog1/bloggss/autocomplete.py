@@ -0,0 +1,170 @@
+"""
+In-process prefix index for the search box autocomplete.
+
+Published post titles and category names are kept in a sorted list, and a
+lookup is a bisect to the first key starting with the prefix plus a short
+scan, so answering a keystroke never touches the database. Each title is
+also indexed from every later word ("intro to django" can be found by
+"django").
+
+The index is built the first time it is needed and then kept up to date
+by the Blog/Category signals in this process. Other processes (more web
+workers, management commands) bump the cache versions when they write,
+and a version that moved behind this process's back means a rebuild on the
+next lookup.
+"""
+import threading
+from bisect import bisect_left
+
+from django.urls import reverse
+
+from .cache import get_versions, model_version_name
+from .models import Blog, Category
+
+
+MAX_RESULTS = 8
+MIN_PREFIX = 2
+VERSIONED = (Blog, Category)  # the order of current_versions()
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def index_keys(text):
+    words = normalize(text).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """Sorted (key, kind, pk) tuples with the display data kept alongside."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = []
+        self.items = {}     # (kind, pk) -> {'label', 'type', 'url'}
+        self.versions = None
+
+    # ---------- building ----------
+
+    def _add(self, kind, pk, label, url):
+        self.items[(kind, pk)] = {'label': label, 'type': kind, 'url': url}
+        for key in index_keys(label):
+            entry = (key, kind, pk)
+            self.entries.insert(bisect_left(self.entries, entry), entry)
+
+    def _remove(self, kind, pk):
+        item = self.items.pop((kind, pk), None)
+        if item is None:
+            return
+        for key in index_keys(item['label']):
+            entry = (key, kind, pk)
+            i = bisect_left(self.entries, entry)
+            if i < len(self.entries) and self.entries[i] == entry:
+                del self.entries[i]
+
+    def rebuild(self):
+        with self.lock:
+            versions = current_versions()
+            items = {}
+            entries = []
+            for pk, title, slug in Blog.objects.published().values_list('pk', 'title', 'slug').iterator():
+                items[('post', pk)] = {'label': title, 'type': 'post', 'url': post_url(slug)}
+                entries.extend((key, 'post', pk) for key in index_keys(title))
+            for pk, name in Category.objects.values_list('pk', 'category_name'):
+                items[('category', pk)] = {'label': name, 'type': 'category', 'url': category_url(pk)}
+                entries.extend((key, 'category', pk) for key in index_keys(name))
+            entries.sort()
+            self.entries, self.items, self.versions = entries, items, versions
+
+    def ensure_fresh(self):
+        """Build on first use, rebuild if another process changed posts or categories."""
+        if self.versions is None or self.versions != current_versions():
+            self.rebuild()
+
+    # ---------- incremental updates (signals) ----------
+
+    def update_post(self, blog):
+        self.update_posts([blog])
+
+    def remove_post(self, pk):
+        self.update_posts([], removed=[pk])
+
+    def update_posts(self, blogs, removed=()):
+        """Re-index `blogs` and drop the `removed` post ids, then mark the index fresh."""
+        with self.lock:
+            if self.versions is None:
+                return  # not built yet, the first lookup reads everything
+            for pk in removed:
+                self._remove('post', pk)
+            for blog in blogs:
+                self._remove('post', blog.pk)
+                if blog.status == 'published':
+                    self._add('post', blog.pk, blog.title, post_url(blog.slug))
+            self._mark_seen(Blog)
+
+    def update_category(self, category, deleted=False):
+        with self.lock:
+            if self.versions is None:
+                return
+            self._remove('category', category.pk)
+            if not deleted:
+                self._add('category', category.pk, category.category_name, category_url(category.pk))
+            self._mark_seen(Category)
+
+    def _mark_seen(self, model):
+        """
+        After applying this process's own change, whose signal bumped `model`'s
+        version once: the index is fresh only if nothing else moved a version
+        since it was last in sync. Otherwise the next lookup rebuilds.
+        """
+        expected = list(self.versions)
+        expected[VERSIONED.index(model)] += 1
+        current = current_versions()
+        self.versions = current if current == expected else None
+
+    def invalidate(self):
+        with self.lock:
+            self.versions = None
+
+    # ---------- lookups ----------
+
+    def lookup(self, prefix, limit=MAX_RESULTS):
+        prefix = normalize(prefix)
+        if len(prefix) < MIN_PREFIX:
+            return []
+        self.ensure_fresh()
+        with self.lock:
+            entries, items = self.entries, self.items
+            results = []
+            seen = set()
+            i = bisect_left(entries, (prefix,))
+            # look a little further than `limit` so titles that start with
+            # the prefix can go before ones that only match a later word
+            while i < len(entries) and entries[i][0].startswith(prefix) and len(results) < limit * 4:
+                _, kind, pk = entries[i]
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    results.append(items[(kind, pk)])
+                i += 1
+        results.sort(key=lambda item: not normalize(item['label']).startswith(prefix))
+        return results[:limit]
+
+
+def current_versions():
+    return get_versions(*[model_version_name(model) for model in VERSIONED])
+
+
+def post_url(slug):
+    return reverse('single_blogs', args=[slug])
+
+
+def category_url(pk):
+    return reverse('category_posts', args=[pk])
+
+
+index = PrefixIndex()
+
+
+def suggest(prefix, limit=MAX_RESULTS):
+    return index.lookup(prefix, limit)
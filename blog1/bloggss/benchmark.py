@@ -0,0 +1,327 @@
+"""
+Small helpers shared by the benchmark management commands.
+
+Benchmarks never touch the real database: they run inside a throwaway test
+database (created the same way ``manage.py test`` does) that is destroyed
+when the benchmark finishes.
+"""
+import asyncio
+import http.client
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection, connections, transaction
+
+from . import category_counts, counters, hits, rendering, stats
+from .models import Blog, Category
+
+
+WORDS = (
+    "django python async cache query index database template view model "
+    "migration signal middleware request response session queryset orm "
+    "sqlite postgres redis deploy docker testing performance security api "
+    "rest json form admin static media upload image feed sitemap search "
+    "ranking pagination cursor batch worker thread process memory latency"
+).split()
+
+
+@contextmanager
+def isolated_database(verbosity=0, on_disk=False):
+    """
+    Create a fresh test database, yield, then destroy it.
+
+    SQLite test databases live in memory with a shared cache, where a write
+    fails at once ("table is locked") if another thread is reading instead of
+    waiting like it would on a real file. Pass on_disk=True for threaded load.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if on_disk and connection.vendor == 'sqlite':
+        temp_dir = tempfile.mkdtemp(prefix='blog-bench-')
+        test_settings['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        hits.discard()  # views of throwaway posts must not reach the real table at exit
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        if temp_dir:
+            test_settings['NAME'] = old_test_name
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+# share of the seeded users in each role group (the rest are Authors)
+ROLE_SHARES = (('Manager', 0.05), ('Editor', 0.15))
+
+
+def seed_users(count, batch_size=2000, password='bench-password'):
+    """
+    Bulk insert `count` users split across the Manager/Editor/Author groups.
+    Returns {group name: [users]}. They all share one password (hashed once).
+    """
+    hashed = make_password(password)
+    users = []
+    for offset in range(0, count, batch_size):
+        with transaction.atomic():
+            users += User.objects.bulk_create([
+                User(username=f"bench-user-{i}", email=f"bench-user-{i}@example.com", password=hashed)
+                for i in range(offset, min(offset + batch_size, count))
+            ])
+
+    by_role = {}
+    start = 0
+    for name, share in ROLE_SHARES + (('Author', None),):
+        end = len(users) if share is None else start + max(1, round(count * share))
+        by_role[name] = users[start:end]
+        start = end
+
+    through = User.groups.through
+    with transaction.atomic():
+        for name, members in by_role.items():
+            group, _ = Group.objects.get_or_create(name=name)
+            through.objects.bulk_create(
+                [through(user_id=user.pk, group_id=group.pk) for user in members],
+                batch_size=batch_size,
+            )
+    return by_role
+
+
+def seed_categories(count):
+    with transaction.atomic():
+        return Category.objects.bulk_create([Category(category_name=f"Category {i}") for i in range(count)])
+
+
+def seed_blogs(count, start=0, batch_size=2000, seed=0, author=None, categories=None, authors=None):
+    """
+    Bulk insert `count` published posts numbered from `start`.
+    Creates a bench author and a handful of categories if none are given;
+    with `authors` each post gets one of them at random.
+    """
+    rng = random.Random(seed + start)
+    if author is None and not authors:
+        author, _ = User.objects.get_or_create(username='bench-author')
+    if categories is None:
+        categories = list(Category.objects.all()[:10]) or Category.objects.bulk_create(
+            [Category(category_name=f"Category {i}") for i in range(10)]
+        )
+
+    for offset in range(0, count, batch_size):
+        batch = []
+        for i in range(start + offset, start + min(offset + batch_size, count)):
+            title = f"{random_text(rng, 6).title()} {i}"
+            blog = Blog(
+                title=title,
+                slug=f"bench-post-{i}",
+                content=random_text(rng, 300),
+                short_desc=random_text(rng, 30),
+                category=rng.choice(categories),
+                author=rng.choice(authors) if authors else author,
+                blog_image='uploads/bench.jpg',
+                status='published',
+                is_featured=(i % 50 == 0),
+            )
+            rendering.compile_fields(blog)
+            batch.append(blog)
+        with transaction.atomic():
+            Blog.objects.bulk_create(batch)
+
+    # bulk_create skips the signals that maintain the rollups
+    stats.rebuild()
+    counters.reconcile()
+    category_counts.rebuild()
+    return author, categories
+
+
+def time_call(func, repeat=20):
+    """Call func() `repeat` times and return the timings in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """p50/p95/p99/mean (ms) for a list of timings."""
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+    }
+
+
+# ---------- in-process ASGI load ----------
+
+async def asgi_get(app, url, headers=()):
+    """GET url from an ASGI app without a server. Returns (status, body)."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'localhost')] + [(k.encode(), v.encode()) for k, v in headers],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status = None
+    body = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the view runs
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return status, b''.join(body)
+
+
+async def run_load(app, urls, total, concurrency):
+    """
+    Fire `total` GETs (cycling through urls) with `concurrency` requests in
+    flight. Returns (latencies in ms, error count, elapsed seconds).
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def client():
+        nonlocal errors, next_index
+        while next_index < total:
+            url = urls[next_index % len(urls)]
+            next_index += 1
+            started = time.perf_counter()
+            status, _ = await asgi_get(app, url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - started
+
+
+# ---------- threaded load (test client or a local WSGI server) ----------
+
+def run_threads(get, urls, total, concurrency, max_seconds=None):
+    """
+    Fire up to `total` GETs (cycling through urls) from `concurrency` threads,
+    stopping early after `max_seconds`. `get()` is called once per thread and
+    returns that thread's fetch(url) -> status function.
+    Returns (latencies in ms, error count, elapsed seconds).
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + max_seconds if max_seconds else None
+
+    def worker():
+        nonlocal errors, next_index
+        fetch = get()
+        try:
+            while True:
+                with lock:
+                    if next_index >= total or (deadline and time.perf_counter() > deadline):
+                        return
+                    url = urls[next_index % len(urls)]
+                    next_index += 1
+                started = time.perf_counter()
+                try:
+                    status = fetch(url)
+                except Exception:
+                    status = None
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed_ms)
+                    if status is None or status >= 400:
+                        errors += 1
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def wsgi_server(app, host='127.0.0.1'):
+    """Serve a WSGI app from a thread (runserver's threaded server) on a free port. Yields the port."""
+    server = ThreadedWSGIServer((host, 0), QuietRequestHandler, allow_reuse_address=False)
+    server.set_app(app)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def http_get(host, port, url, headers=None):
+    """GET url over a fresh connection and read the whole body. Returns the status."""
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+    try:
+        conn.request('GET', url, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
@@ -0,0 +1,92 @@
+"""
+Versioned caching helpers.
+
+Every cached value is stored under a key that contains the current version
+of the models it was built from. Saving or deleting one of those models
+bumps its version (see signals.py), so old entries are simply never read
+again and expire on their own - nothing has to be deleted.
+"""
+import time
+
+from django.core.cache import cache
+
+
+DATA_TIMEOUT = 60 * 60  # one hour, stale versions just age out
+
+_MISSING = object()
+
+
+def _version_key(name):
+    return f'bloggss:version:{name}'
+
+
+def _new_version():
+    # Millisecond timestamp: if a version key is ever evicted the new one
+    # can't collide with a version that was used before.
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    """Current version for each name, creating missing ones."""
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_version(), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+async def aget_versions(*names):
+    """get_versions() for async code."""
+    keys = [_version_key(name) for name in names]
+    found = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            await cache.aadd(key, _new_version(), None)
+            version = await cache.aget(key)
+        versions.append(version)
+    return versions
+
+
+def bump_version(name):
+    """Invalidate everything cached against `name`."""
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def model_version_name(model):
+    return model._meta.label_lower
+
+
+def cached(name, models, builder, timeout=DATA_TIMEOUT):
+    """
+    Return builder() cached under `name` for the current versions of `models`.
+    Only builder() touches the database, a warm hit is two cache reads.
+    """
+    versions = get_versions(*[model_version_name(model) for model in models])
+    key = f"bloggss:{name}:{'.'.join(str(v) for v in versions)}"
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+async def acached(name, models, builder, timeout=DATA_TIMEOUT):
+    """cached() for async code, `builder` is a coroutine function."""
+    versions = await aget_versions(*[model_version_name(model) for model in models])
+    key = f"bloggss:{name}:{'.'.join(str(v) for v in versions)}"
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        value = await builder()
+        await cache.aset(key, value, timeout)
+    return value
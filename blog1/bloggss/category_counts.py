@@ -0,0 +1,128 @@
+"""
+Published post counts per category, for the sidebar.
+
+The first read runs one grouped query (every category with its number of
+published posts) and caches each count under its own key. After that the
+post_save/post_delete/blogs_bulk_changed receivers in signals.py only
+incr/decr the keys of the categories a post left or joined, so the sidebar
+never counts again. A key that has gone missing (evicted, expired, a new
+category) makes the next read recount everything.
+
+Adjustments run once the transaction commits, so a rolled back save never
+reaches the counts and a recount can't read rows that aren't visible yet.
+A recount only fills in missing keys (cache.add), and stores nothing if an
+adjustment missed a key while it was counting: the count it read may be
+from before that change.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .cache import DATA_TIMEOUT
+from .models import Category
+from .stats import is_published
+
+
+MISSES_KEY = 'bloggss:category_posts:misses'
+
+
+def _key(pk):
+    return f'bloggss:category_posts:{pk}'
+
+
+def _counts_query():
+    return (
+        Category.objects.order_by()
+        .values('pk')  # group by the id alone
+        .annotate(posts=Count('blog', filter=Q(blog__status='published')))
+        .values_list('pk', 'posts')
+    )
+
+
+def _store(counts, misses):
+    if cache.get(MISSES_KEY) == misses:
+        for pk, count in counts.items():
+            # a key that exists was kept up to date while we counted
+            cache.add(_key(pk), count, DATA_TIMEOUT)
+    return counts
+
+
+def rebuild():
+    """Count again and cache the result. Returns {category id: published posts}."""
+    misses = cache.get(MISSES_KEY)
+    return _store(dict(_counts_query()), misses)
+
+
+async def arebuild():
+    misses = await cache.aget(MISSES_KEY)
+    counts = {pk: count async for pk, count in _counts_query()}
+    return await sync_to_async(_store)(counts, misses)
+
+
+def _from_cache(found, category_ids):
+    counts = {pk: found.get(_key(pk)) for pk in category_ids}
+    if None in counts.values():
+        return None
+    return counts
+
+
+def get_counts(category_ids):
+    """{category id: published posts} for these categories (a single cache read when warm)."""
+    found = cache.get_many([_key(pk) for pk in category_ids])
+    return _from_cache(found, category_ids) or rebuild()
+
+
+async def aget_counts(category_ids):
+    found = await cache.aget_many([_key(pk) for pk in category_ids])
+    return _from_cache(found, category_ids) or await arebuild()
+
+
+def changes(before, after):
+    """
+    {category id: delta} for a post that went from `before` to `after`,
+    each a (status, category id) pair or None (not there).
+    """
+    deltas = {}
+    if before and is_published(before[0]):
+        deltas[before[1]] = deltas.get(before[1], 0) - 1
+    if after and is_published(after[0]):
+        deltas[after[1]] = deltas.get(after[1], 0) + 1
+    return deltas
+
+
+def adjust(deltas):
+    """Apply {category id: delta} once the current transaction commits."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(partial(_apply, deltas))
+
+
+def _apply(deltas):
+    for pk, delta in deltas.items():
+        try:
+            cache.incr(_key(pk), delta)
+        except ValueError:
+            # not cached: the next read recounts with this post included, and
+            # a recount already running may have read it without, so tell it
+            try:
+                cache.incr(MISSES_KEY)
+            except ValueError:
+                cache.set(MISSES_KEY, 1, None)
+
+
+def add_category(pk):
+    """A new category has no posts yet, no need to recount for it."""
+    transaction.on_commit(partial(cache.add, _key(pk), 0, DATA_TIMEOUT))
+
+
+def forget(*category_ids):
+    """Drop these counts, so the next read recounts."""
+    cache.delete_many([_key(pk) for pk in category_ids])
+
+
+def forget_all():
+    """For a change that can't be worked out (e.g. a post saved with status deferred)."""
+    transaction.on_commit(lambda: forget(*Category.objects.values_list('pk', flat=True)))
@@ -1,17 +1,98 @@
+from django.utils.functional import SimpleLazyObject
+
+from users.roles import aget_roles
+
+from . import category_counts
+from .cache import acached, cached
 from .models import Category
 from assign.models import About, FollowUs
 
+# Each value is lazy: pages that never use the sidebar don't hit the cache or
+# the database at all. When used, it comes from a cache keyed on the model
+# versions, which signals.py bumps on every save/delete.
+#
+# A lazy value can't run its query while an async view renders the template
+# (Django raises SynchronousOnlyOperation), so async views load the same
+# values up front with `asidebar()` and put them in their own context,
+# which takes precedence over the processors.
+
+
+def _categories():
+    return cached(
+        'categories', [Category],
+        lambda: list(Category.objects.all().order_by('-updated_at')),
+    )
+
+
+def _with_post_counts(categories, counts):
+    # counts change with every post, so they are cached apart from the list
+    for category in categories:
+        category.post_count = counts.get(category.pk, 0)
+    return categories
+
 
 def get_categories(request):
-    categories = Category.objects.all().order_by('-updated_at')
-    return {'categories': categories}
+    # aside_categories: the same list with post_count, only pages that
+    # include partials/aside.html read it (and pay for the counts)
+    return {
+        'categories': SimpleLazyObject(_categories),
+        'aside_categories': SimpleLazyObject(lambda: _with_post_counts(
+            _categories(), category_counts.get_counts([c.pk for c in _categories()]),
+        )),
+    }
 
 
 def about_us(request):
-    abouts = About.objects.get()
+    # About is a single row, first() so an empty table doesn't crash every page
+    abouts = SimpleLazyObject(lambda: cached(
+        'about', [About],
+        lambda: About.objects.first(),
+    ))
     return {'abouts': abouts}
 
 
 def get_follow_us(request):
-    follow_us_links = FollowUs.objects.all()
-    return {'follow_us_links': follow_us_links}
\ No newline at end of file
+    follow_us_links = SimpleLazyObject(lambda: cached(
+        'follow_us', [FollowUs],
+        lambda: list(FollowUs.objects.all()),
+    ))
+    return {'follow_us_links': follow_us_links}
+
+
+# ---------- async views ----------
+
+async def _acategories():
+    return [category async for category in Category.objects.all().order_by('-updated_at')]
+
+
+async def _about():
+    return await About.objects.afirst()
+
+
+async def _follow_us():
+    return [link async for link in FollowUs.objects.all()]
+
+
+async def asidebar():
+    """The values of the three processors above, loaded with the async ORM."""
+    categories = await acached('categories', [Category], _acategories)
+    counts = await category_counts.aget_counts([c.pk for c in categories])
+    return {
+        'categories': categories,
+        'aside_categories': _with_post_counts(list(categories), counts),
+        'abouts': await acached('about', [About], _about),
+        'follow_us_links': await acached('follow_us', [FollowUs], _follow_us),
+    }
+
+
+async def acontext(request):
+    """
+    Everything base.html needs that would otherwise be loaded lazily (and
+    synchronously) while rendering: the user, their roles for the header's
+    dashboard link, and the sidebar.
+    """
+    user = await request.auser()  # also loads the session, so messages are safe
+    await aget_roles(user, request)
+    context = {'user': user}
+    context.update(await asidebar())
+    return context
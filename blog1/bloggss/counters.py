@@ -0,0 +1,122 @@
+"""
+Row counters for the dashboards.
+
+Each Counter row is bumped with `value = value + 1` (an F() expression, so
+concurrent requests can't lose updates) from the post_save/post_delete
+signals in signals.py. The bump runs in whatever transaction the save is in:
+the dashboard views and the admin save inside transaction.atomic, so the row
+and its counter commit or roll back together. A save made in autocommit
+elsewhere (the shell, a script) can drift if it fails between the two.
+
+A missing counter is seeded from an exact COUNT the first time it is read,
+and `reconcile()` (manage.py reconcile_counters) corrects any drift, e.g.
+after bulk operations that skip signals.
+
+Each author also has a "posts-by:<id>" counter (seeded for existing posts by
+migration 0015), so the system reports can name the most active author
+without grouping the whole Blog table.
+"""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Blog, Category, Counter
+
+
+BLOGS = 'blogs'
+CATEGORIES = 'categories'
+USERS = 'users'
+AUTHOR_PREFIX = 'posts-by:'
+
+
+def counted_models():
+    return {
+        BLOGS: Blog,
+        CATEGORIES: Category,
+        USERS: get_user_model(),
+    }
+
+
+def author_posts(author_id):
+    """The name of the counter holding an author's number of posts."""
+    return f'{AUTHOR_PREFIX}{author_id}'
+
+
+def exact_count(name):
+    if name.startswith(AUTHOR_PREFIX):
+        return Blog.objects.filter(author_id=int(name[len(AUTHOR_PREFIX):])).count()
+    return counted_models()[name].objects.count()
+
+
+def exact_author_counts():
+    """{counter name: posts} for every author with posts (one grouped query over Blog)."""
+    rows = Blog.objects.order_by().values('author_id').annotate(posts=Count('id')).values_list('author_id', 'posts')
+    return {author_posts(author_id): posts for author_id, posts in rows}
+
+
+def top_author():
+    """(author id, posts) for the author with the most posts, or None. Reads the counters only."""
+    row = (
+        Counter.objects.filter(name__startswith=AUTHOR_PREFIX, value__gt=0)
+        .order_by('-value', 'name')
+        .values_list('name', 'value')
+        .first()
+    )
+    if row is None:
+        return None
+    return int(row[0][len(AUTHOR_PREFIX):]), row[1]
+
+
+def increment(name, delta=1):
+    """Atomically add delta to the counter (seeding it if it doesn't exist yet)."""
+    if not Counter.objects.filter(name=name).update(value=F('value') + delta):
+        # First use: the row being saved/deleted is already reflected in COUNT(*)
+        set_value(name, exact_count(name))
+
+
+def set_value(name, value):
+    try:
+        with transaction.atomic():
+            Counter.objects.update_or_create(name=name, defaults={'value': value})
+    except IntegrityError:
+        Counter.objects.filter(name=name).update(value=value)
+
+
+def get_counts(*names, exact=False):
+    """{name: total} from the counter table (one query), or from COUNT(*) if exact."""
+    if exact:
+        return {name: exact_count(name) for name in names}
+
+    counts = dict(Counter.objects.filter(name__in=names).values_list('name', 'value'))
+    for name in names:
+        if name not in counts:
+            counts[name] = exact_count(name)
+            set_value(name, counts[name])
+    return counts
+
+
+def reconcile(names=None):
+    """
+    Reset counters to their exact COUNT(*) (all of them, author counters
+    included, when no names are given).
+    Returns {name: (stored, exact)} for every counter that had drifted.
+    """
+    if names:
+        exact = {name: exact_count(name) for name in names}
+    else:
+        exact = {name: exact_count(name) for name in counted_models()}
+        authors = exact_author_counts()
+        # authors whose posts are all gone
+        authors.update(dict.fromkeys(
+            Counter.objects.filter(name__startswith=AUTHOR_PREFIX, value__gt=0)
+            .exclude(name__in=authors).values_list('name', flat=True),
+            0,
+        ))
+        exact.update(authors)
+    stored = dict(Counter.objects.filter(name__in=exact).values_list('name', 'value'))
+    drift = {}
+    for name, count in exact.items():
+        if stored.get(name) != count:
+            drift[name] = (stored.get(name), count)
+            set_value(name, count)
+    return drift
@@ -0,0 +1,157 @@
+"""
+RSS 2.0 / Atom feeds for all posts and for each category.
+
+Feed readers poll a lot, so nothing here re-renders the archive per poll:
+
+* the list of (id, updated_at) in a feed is cached until a post or category
+  changes (the usual version keys, see cache.py),
+* each <item>/<entry> is rendered once and cached under the post's
+  updated_at, so after an edit only that item is rendered again,
+* the response is streamed: the channel header, the cached items one by
+  one, then the closing tags,
+* ETag/Last-Modified come from the same cached data, so a poll that hasn't
+  missed anything is answered 304 without rendering at all.
+"""
+import hashlib
+from io import StringIO
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import cached, get_versions, model_version_name
+from .models import Blog, Category
+
+
+FEED_ITEMS = 50
+ITEM_TIMEOUT = 60 * 60 * 24
+
+
+class RssFeed(Rss201rev2Feed):
+    item_tag = 'item'
+    end_tag = '</channel>'
+    last_updated = None
+
+    def latest_post_date(self):
+        # the shell is rendered without items, so the date comes from the index
+        return self.last_updated or super().latest_post_date()
+
+
+class AtomFeed(Atom1Feed):
+    item_tag = 'entry'
+    end_tag = '</feed>'
+    last_updated = None
+
+    def latest_post_date(self):
+        return self.last_updated or super().latest_post_date()
+
+
+FORMATS = {'rss': RssFeed, 'atom': AtomFeed}
+
+
+def feed_index(category_id=None):
+    """
+    {'title', 'items': [(id, updated_at), ...]} newest first, or None for an
+    unknown category. Cached until a post or category is saved/deleted.
+    """
+    def build():
+        posts = Blog.objects.published()
+        title = "DevThoughts"
+        if category_id is not None:
+            category = Category.objects.filter(pk=category_id).first()
+            if category is None:
+                return None
+            posts = posts.filter(category=category_id)
+            title = f"DevThoughts - {category.category_name}"
+        items = list(posts.order_by('-updated_at', '-id').values_list('id', 'updated_at')[:FEED_ITEMS])
+        return {'title': title, 'items': items}
+
+    return cached(f"feed-index:{category_id or 'all'}", [Blog, Category], build)
+
+
+def feed_etag(fmt, category_id, host):
+    """Changes whenever the cached index (or a category name in it) could."""
+    versions = get_versions(model_version_name(Blog), model_version_name(Category))
+    return hashlib.md5(f"{fmt}:{category_id}:{host}:{versions}".encode()).hexdigest()
+
+
+def _new_feed(fmt, index, request, category_id):
+    if category_id is None:
+        link, feed_url = reverse('home'), reverse('blog_feed', args=[fmt])
+    else:
+        link = reverse('category_posts', args=[category_id])
+        feed_url = reverse('category_feed', args=[category_id, fmt])
+    feed = FORMATS[fmt](
+        title=index['title'],
+        link=request.build_absolute_uri(link),
+        description="Latest posts from DevThoughts",
+        feed_url=request.build_absolute_uri(feed_url),
+        language='en',
+    )
+    if index['items']:
+        feed.last_updated = index['items'][0][1]
+    return feed
+
+
+def _shell(feed):
+    """The feed without items, split where the items go."""
+    xml = feed.writeString('utf-8')
+    cut = xml.rindex(feed.end_tag)
+    return xml[:cut], xml[cut:]
+
+
+def _render_item(feed, blog, request):
+    link = request.build_absolute_uri(reverse('single_blogs', args=[blog.slug]))
+    feed.items = []
+    feed.add_item(
+        title=blog.title,
+        link=link,
+        description=blog.short_desc,
+        author_name=blog.author.username,
+        pubdate=blog.created_at,
+        updateddate=blog.updated_at,
+        unique_id=link,
+        categories=[blog.category.category_name],
+    )
+    out = StringIO()
+    handler = SimplerXMLGenerator(out, 'utf-8')
+    item = feed.items[0]
+    handler.startElement(feed.item_tag, feed.item_attributes(item))
+    feed.add_item_elements(handler, item)
+    handler.endElement(feed.item_tag)
+    return out.getvalue()
+
+
+def _item_key(fmt, host, category_version, blog_id, updated_at):
+    return f"bloggss:feed-item:{fmt}:{host}:{category_version}:{blog_id}:{updated_at.timestamp()}"
+
+
+def stream_feed(fmt, index, request, category_id=None):
+    """Yield the feed document piece by piece."""
+    feed = _new_feed(fmt, index, request, category_id)
+    head, tail = _shell(feed)
+    yield head
+
+    host = request.get_host()
+    category_version = get_versions(model_version_name(Category))[0]
+    keys = {
+        blog_id: _item_key(fmt, host, category_version, blog_id, updated_at)
+        for blog_id, updated_at in index['items']
+    }
+    found = cache.get_many(list(keys.values()))
+
+    # render (in one query) only the items that changed since they were cached
+    missing = [blog_id for blog_id, key in keys.items() if key not in found]
+    if missing:
+        fresh = {}
+        for blog_id, blog in Blog.objects.listing().in_bulk(missing).items():
+            fresh[keys[blog_id]] = _render_item(feed, blog, request)
+        cache.set_many(fresh, ITEM_TIMEOUT)
+        found.update(fresh)
+
+    for blog_id, _ in index['items']:
+        fragment = found.get(keys[blog_id])
+        if fragment:
+            yield fragment
+    yield tail
@@ -0,0 +1,111 @@
+"""
+Write-behind page view counters.
+
+A hit only bumps a number in an in-process buffer. Every FLUSH_HITS hits, or
+once FLUSH_INTERVAL seconds have passed since the last flush, the request
+that notices writes the whole buffer with one
+``UPDATE ... SET views = views + n WHERE id IN (...)`` per distinct n, in
+one transaction. So the SQLite writer sees a handful of statements every few
+seconds instead of one per page view.
+
+Each worker process has its own buffer (they only ever add), and whatever
+is still buffered when a worker exits is written by an atexit hook. Hits
+buffered in a worker that is killed outright are lost, which is fine for
+view counts.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from .models import Blog
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def flush_hits():
+    return getattr(settings, 'BLOG_VIEWS_FLUSH_HITS', 100)
+
+
+def flush_interval():
+    return getattr(settings, 'BLOG_VIEWS_FLUSH_INTERVAL', 10)
+
+
+def record_hit(blog_id):
+    """Count one view. Returns True if the caller should flush() now."""
+    with _lock:
+        _pending[blog_id] += 1
+        return (sum(_pending.values()) >= flush_hits()
+                or time.monotonic() - _last_flush >= flush_interval())
+
+
+def pending():
+    with _lock:
+        return dict(_pending)
+
+
+def discard():
+    """Forget the buffered hits without writing them."""
+    with _lock:
+        _pending.clear()
+
+
+def flush():
+    """Write the buffered hits. Returns the number of hits written."""
+    global _pending, _last_flush
+    with _lock:
+        batch, _pending = _pending, Counter()
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+
+    by_count = defaultdict(list)
+    for blog_id, count in batch.items():
+        by_count[count].append(blog_id)
+    try:
+        with transaction.atomic():
+            for count, ids in by_count.items():
+                # update() leaves updated_at (and every page cache) alone
+                Blog.objects.filter(pk__in=ids).update(views=F('views') + count)
+    except Exception:
+        # put them back, the next flush tries again
+        with _lock:
+            _pending.update(batch)
+        raise
+    return sum(batch.values())
+
+
+def try_flush():
+    """
+    flush() for the request path: a locked/busy database must not fail the
+    page that happened to be due. The hits stay buffered for the next flush.
+    """
+    try:
+        return flush()
+    except DatabaseError:
+        logger.warning("Could not write buffered page views, keeping them for the next flush", exc_info=True)
+        return 0
+
+
+def hit(blog_id):
+    """record_hit() + try_flush() when due, for sync views."""
+    if record_hit(blog_id):
+        try_flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Could not write %s buffered page views", sum(_pending.values()))
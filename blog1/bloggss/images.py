@@ -0,0 +1,137 @@
+"""
+Resized / WebP derivatives of Blog.blog_image.
+
+After a post is created or its image replaced, the original upload is handed
+to a process pool that writes a JPEG and a WebP copy at each width in
+BLOG_IMAGE_WIDTHS (never upscaling). The result is stored on the post
+(image_width, image_height, image_variants) and the templates build
+srcset/width/height from it.
+
+BLOG_IMAGE_PIPELINE picks how the work runs:
+    "process" - background worker processes (default)
+    "sync"    - in the request, handy for tests and local debugging
+    "off"     - don't generate derivatives
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+DEFAULT_WIDTHS = (480, 960, 1440)
+DERIVED_DIR = 'derived'
+
+JPEG_OPTIONS = {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}
+WEBP_OPTIONS = {'format': 'WEBP', 'quality': 80, 'method': 4}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def widths():
+    return tuple(sorted(getattr(settings, 'BLOG_IMAGE_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def pipeline_mode():
+    return getattr(settings, 'BLOG_IMAGE_PIPELINE', 'process')
+
+
+# ---------- the worker side (plain Pillow, no Django/DB access) ----------
+
+def build_derivatives(name, media_root, target_widths):
+    """
+    Write the derivatives of media_root/name and describe them.
+    Runs inside a worker process, so it only gets picklable arguments.
+    """
+    from PIL import Image, ImageOps
+
+    source = os.path.join(media_root, name)
+    stem = os.path.splitext(name)[0]
+    out_dir = os.path.join(media_root, DERIVED_DIR, os.path.dirname(name))
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        width, height = image.size
+
+        # every requested width below the original, plus the original size
+        sizes = [w for w in target_widths if w < width] + [width]
+        variants = []
+        for target in sizes:
+            target_height = round(height * target / width)
+            resized = image if target == width else image.resize((target, target_height), Image.LANCZOS)
+
+            base = f"{DERIVED_DIR}/{stem}-{target}w"
+            resized.save(os.path.join(media_root, base + '.jpg'), **JPEG_OPTIONS)
+            resized.save(os.path.join(media_root, base + '.webp'), **WEBP_OPTIONS)
+            variants.append({
+                'width': target,
+                'height': target_height,
+                'jpeg': base + '.jpg',
+                'webp': base + '.webp',
+            })
+
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+# ---------- the Django side ----------
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'BLOG_IMAGE_WORKERS', 2))
+    return _executor
+
+
+def save_result(blog_id, name, result):
+    """Store a worker result, unless the post's image changed in the meantime."""
+    from .models import Blog
+    from .page_cache import forget_post
+
+    Blog.objects.filter(pk=blog_id, blog_image=name).update(
+        image_width=result['width'],
+        image_height=result['height'],
+        image_variants=result['variants'],
+    )
+    # update() doesn't touch updated_at, so retire the cached page explicitly
+    forget_post(*Blog.objects.filter(pk=blog_id).values_list('slug', flat=True))
+
+
+def _on_done(blog_id, name):
+    scheduled_from = threading.get_ident()
+
+    def callback(future):
+        try:
+            save_result(blog_id, name, future.result())
+        except Exception:
+            logger.exception("Image derivatives failed for blog %s", blog_id)
+        finally:
+            # Normally runs on the executor's helper thread, which then owns
+            # a connection of its own that nobody else will close.
+            if threading.get_ident() != scheduled_from:
+                connection.close()
+    return callback
+
+
+def schedule(blog):
+    """Queue derivative generation for the post's current image (after commit)."""
+    mode = pipeline_mode()
+    name = blog.blog_image.name if blog.blog_image else ''
+    if mode == 'off' or not name:
+        return
+
+    args = (name, str(settings.MEDIA_ROOT), widths())
+
+    def run():
+        if mode == 'sync':
+            save_result(blog.pk, name, build_derivatives(*args))
+        else:
+            get_executor().submit(build_derivatives, *args).add_done_callback(_on_done(blog.pk, name))
+
+    transaction.on_commit(run)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bloggss import rendering
+from bloggss.models import Blog
+
+
+class Command(BaseCommand):
+    help = "Fill in content_html, excerpt, word_count and reading_time for posts saved before they existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute every post, not only the ones never compiled")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Posts read and written per transaction (default 500)")
+
+    def handle(self, *args, **options):
+        posts = Blog.objects.all()
+        if not options['all']:
+            # content is required, so a compiled post always has some HTML
+            posts = posts.filter(content_html='')
+
+        started = time.perf_counter()
+        done = rendering.compile_rows(
+            posts, options['batch_size'], progress=lambda done: self.stderr.write(f"  {done} posts..."),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {done} post(s) in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f} posts/s)."
+        ))
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bloggss import images
+from bloggss.models import Blog
+
+
+# queued images per worker: enough to keep them busy, and the most futures
+# (and their results) held in memory at once
+PENDING_PER_WORKER = 4
+
+
+class Command(BaseCommand):
+    help = "Generate resized/WebP derivatives for existing blog images in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'BLOG_IMAGE_WORKERS', 2))
+        parser.add_argument('--force', action='store_true',
+                            help="Regenerate even for posts that already have derivatives")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Posts read from the database at a time")
+
+    def handle(self, *args, **options):
+        posts = Blog.objects.exclude(blog_image='')
+        if not options['force']:
+            posts = posts.filter(image_width__isnull=True)
+        todo = posts.values_list('pk', 'blog_image').order_by('pk')
+
+        media_root = str(settings.MEDIA_ROOT)
+        widths = images.widths()
+        max_pending = options['workers'] * PENDING_PER_WORKER
+        pending = {}
+        totals = {'done': 0, 'failed': 0}
+        last_pk = 0
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                # a chunk at a time by primary key, so no cursor stays open
+                # while the results are written
+                chunk = list(todo.filter(pk__gt=last_pk)[:options['chunk_size']])
+                if not chunk:
+                    break
+                last_pk = chunk[-1][0]
+                for pk, name in chunk:
+                    if len(pending) >= max_pending:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        self.collect(finished, pending, totals)
+                    pending[pool.submit(images.build_derivatives, name, media_root, widths)] = (pk, name)
+            self.collect(as_completed(list(pending)), pending, totals)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['done']} image(s) in {elapsed:.1f}s, {totals['failed']} failed."
+        ))
+
+    def collect(self, futures, pending, totals):
+        """Store the results of these finished futures and drop them from `pending`."""
+        for future in futures:
+            pk, name = pending.pop(future)
+            try:
+                images.save_result(pk, name, future.result())
+                totals['done'] += 1
+            except Exception as exc:
+                totals['failed'] += 1
+                self.stderr.write(f"  post {pk} ({name}): {exc}")
@@ -0,0 +1,78 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from bloggss.benchmark import isolated_database, seed_blogs, summarize, time_call
+from bloggss.models import Blog
+
+
+URL = '/admin/bloggss/blog/'
+PER_PAGE = 100  # ModelAdmin.list_per_page
+
+
+class Command(BaseCommand):
+    help = "Measure BlogAdmin changelist latency at scale, stock admin vs BLOG_ADMIN_SCALABLE"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 200000],
+                            help="Post counts to measure at (default 10000 200000)")
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--json', action='store_true', help="Print machine readable results")
+
+    def handle(self, *args, **options):
+        results = []
+        with isolated_database(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            client.force_login(User.objects.create_superuser('bench-admin', 'bench@example.com', 'x'))
+            seeded = 0
+            author = categories = None
+            for size in sorted(options['sizes']):
+                self.stderr.write(f"Seeding up to {size} posts...")
+                author, categories = seed_blogs(
+                    size - seeded, start=seeded, author=author, categories=categories,
+                )
+                seeded = size
+
+                for scenario, stock, scalable in self.scenarios(size):
+                    for mode, params in (('stock', stock), ('scalable', scalable)):
+                        with override_settings(BLOG_ADMIN_SCALABLE=(mode == 'scalable')):
+                            sql_ms = []
+
+                            def run():
+                                with CaptureQueriesContext(connection) as queries:
+                                    response = client.get(URL, params)
+                                assert response.status_code == 200, response.status_code
+                                sql_ms.append(sum(float(q['time']) for q in queries) * 1000)
+
+                            row = {'posts': size, 'scenario': scenario, 'mode': mode}
+                            row.update(summarize(time_call(run, options['repeat'])))
+                            # the rest of a request is mostly rendering 100 editable rows
+                            row['sql_p50_ms'] = summarize(sql_ms)['p50_ms']
+                            results.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'posts':>8} {'scenario':<12} {'mode':<9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sql p50':>9}")
+        for row in results:
+            self.stdout.write(
+                f"{row['posts']:>8} {row['scenario']:<12} {row['mode']:<9} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['sql_p50_ms']:>9.2f}"
+            )
+
+    def scenarios(self, size):
+        """(name, stock admin params, scalable admin params) showing the same rows."""
+        deep = max(1, size // PER_PAGE // 2)
+        # ?after=<id> lists ids below it, so start just above the page's first row
+        first_of_deep = Blog.objects.order_by('-pk').values_list('pk', flat=True)[(deep - 1) * PER_PAGE]
+        return [
+            ('first page', {}, {}),
+            ('middle page', {'p': deep}, {'after': first_of_deep + 1}),
+            ('filtered', {'is_featured__exact': '1'}, {'is_featured__exact': '1'}),
+            ('search', {'q': 'django'}, {'q': 'django'}),
+        ]
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import random
+from types import ModuleType
+
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from bloggss.benchmark import WORDS, isolated_database, run_load, seed_blogs, summarize
+from bloggss.models import Blog, Category
+
+
+def urlconf(use_async):
+    from Blog.urls import get_urlpatterns
+
+    module = ModuleType('bench_async_urls_' + ('async' if use_async else 'sync'))
+    module.urlpatterns = get_urlpatterns(use_async)
+    return module
+
+
+class Command(BaseCommand):
+    help = "Compare requests/sec and latency of the sync and async read views under concurrent ASGI load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per run (default 2000)")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 20, 100])
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Use a dummy cache so every request renders (default: warm local cache)")
+        parser.add_argument('--json', action='store_true', help="Print machine readable results")
+
+    def handle(self, *args, **options):
+        results = []
+        with isolated_database():
+            self.stderr.write(f"Seeding {options['posts']} posts...")
+            seed_blogs(options['posts'])
+            urls = self.request_mix()
+
+            cache_settings = {}
+            if options['no_cache']:
+                cache_settings['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost'], **cache_settings):
+                app = get_asgi_application()
+                for concurrency in options['concurrency']:
+                    for mode in ('sync', 'async'):
+                        with override_settings(ROOT_URLCONF=urlconf(mode == 'async')):
+                            cache.clear()
+                            # one pass to warm the caches and open connections
+                            asyncio.run(run_load(app, urls, len(urls), concurrency))
+                            latencies, errors, elapsed = asyncio.run(
+                                run_load(app, urls, options['requests'], concurrency)
+                            )
+                        row = {
+                            'mode': mode,
+                            'concurrency': concurrency,
+                            'requests_per_sec': round(len(latencies) / elapsed, 1),
+                            'errors': errors,
+                        }
+                        row.update(summarize(latencies))
+                        results.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'mode':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<6} {row['concurrency']:>5} {row['requests_per_sec']:>9.1f} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['errors']:>7}"
+            )
+
+    def request_mix(self):
+        """Home, category pages, searches and single posts, shuffled."""
+        rng = random.Random(0)
+        slugs = list(Blog.objects.published().order_by('?').values_list('slug', flat=True)[:100])
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        urls = ['/'] * 20
+        urls += [f'/category/{pk}/' for pk in category_ids] * 2
+        urls += [f'/search/?keyword={rng.choice(WORDS)}' for _ in range(30)]
+        urls += [f'/blogs/{slug}/' for slug in slugs]
+        rng.shuffle(urls)
+        return urls
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+
+from bloggss import search
+from bloggss.benchmark import isolated_database, seed_blogs, summarize, time_call
+
+
+class Command(BaseCommand):
+    help = "Compare FTS5 search latency with the old icontains query on a seeded test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help="Post counts to measure at (default 10000 100000)")
+        parser.add_argument('--queries', nargs='+', default=['django', 'cache query', 'perf'])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--json', action='store_true', help="Print machine readable results")
+
+    def handle(self, *args, **options):
+        results = []
+        with isolated_database():
+            seeded = 0
+            author = categories = None
+            for size in sorted(options['sizes']):
+                self.stderr.write(f"Seeding up to {size} posts...")
+                author, categories = seed_blogs(
+                    size - seeded, start=seeded, author=author, categories=categories,
+                )
+                seeded = size
+
+                for query in options['queries']:
+                    for engine, results_for in (
+                        ('fts5', lambda q: search.FTSResults(q, using=connection)),
+                        ('icontains', search.fallback_queryset),
+                    ):
+                        def run():
+                            page = Paginator(results_for(query), options['per_page']).page(1)
+                            list(page.object_list)
+
+                        row = {'posts': size, 'query': query, 'engine': engine}
+                        row.update(summarize(time_call(run, options['repeat'])))
+                        results.append(row)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'posts':>8} {'query':<14} {'engine':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for row in results:
+            self.stdout.write(
+                f"{row['posts']:>8} {row['query']:<14} {row['engine']:<10} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+            )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bloggss import related
+
+
+class Command(BaseCommand):
+    help = "Work out the related posts of new/changed posts (TF-IDF cosine neighbours, needs NumPy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every post, not only changed ones")
+        parser.add_argument('-k', type=int, default=related.TOP_K, help="Related posts kept per post")
+        parser.add_argument('--block-size', type=int, default=related.BLOCK_SIZE,
+                            help="Posts compared per matrix multiplication")
+        parser.add_argument('--features', type=int, default=related.MAX_FEATURES,
+                            help="Vocabulary size (memory is posts x features x 4 bytes)")
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError("build_related_posts needs NumPy: pip install numpy")
+
+        def progress(done):
+            self.stdout.write(f"  compared {done} posts")
+
+        started = time.perf_counter()
+        updated = related.refresh(
+            full=options['full'], k=options['k'], block_size=options['block_size'],
+            max_features=options['features'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated related posts for {updated} posts in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,207 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from bloggss import rendering
+from bloggss.models import STATUS_CHOICES, Blog, Category
+from bloggss.signals import blogs_bulk_changed
+from bloggss.slugs import allocate_slugs
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+@contextmanager
+def keep_timestamps():
+    """
+    bulk_create() fills auto_now/auto_now_add fields with "now", which would
+    throw away the archive's dates. Switch that off while importing.
+    """
+    fields = [Blog._meta.get_field('created_at'), Blog._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row) one row at a time, never the whole file.
+    JSONL rows are decoded later so one broken line only skips that row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_no, line
+
+
+def text_field(row, name):
+    """row[name] as a string ('' when missing), ValueError for lists, numbers, objects."""
+    value = row.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string, not {type(value).__name__}")
+    return value
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Import blog posts from a JSONL or CSV file (use - for stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help="Input format (default: from the file extension, else jsonl)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Posts per INSERT (default 500)")
+        parser.add_argument('--transaction-size', type=int, default=5000,
+                            help="Posts per transaction (default 5000)")
+        parser.add_argument('--author', help="Username used for rows without an author")
+        parser.add_argument('--category', help="Category used for rows without a category")
+        parser.add_argument('--status', default='draft', choices=[value for value, _ in STATUS_CHOICES],
+                            help="Status for rows without one (default draft)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        self.options = options
+        self.authors = {}
+        self.categories = {}
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='' if fmt == 'csv' else None, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+
+        imported = skipped = 0
+        started = time.perf_counter()
+        try:
+            with keep_timestamps():
+                for chunk in chunked(read_rows(stream, fmt), options['transaction_size']):
+                    with transaction.atomic():
+                        for batch in chunked(chunk, options['batch_size']):
+                            created, bad = self.import_batch(batch)
+                            imported += created
+                            skipped += bad
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f"  {imported} posts, {imported / elapsed:.0f} rows/sec")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} posts in {elapsed:.1f}s ({rate:.0f} rows/sec), {skipped} skipped."
+        ))
+
+    def import_batch(self, batch):
+        posts = []
+        skipped = 0
+        for line_no, row in batch:
+            try:
+                if isinstance(row, str):
+                    row = json.loads(row)
+                if not isinstance(row, dict):
+                    raise ValueError("a row must be a JSON object")
+                posts.append(self.build_post(row))
+            except (KeyError, ValueError, TypeError, AttributeError) as exc:
+                # anything odd in one row skips that row, not the whole import
+                skipped += 1
+                self.stderr.write(f"  line {line_no}: {exc}")
+
+        if not posts:
+            return 0, skipped
+
+        for post, slug in zip(posts, allocate_slugs([post.title for post in posts])):
+            post.slug = slug
+        Blog.objects.bulk_create(posts)
+
+        # bulk_create() skips post_save: update the rollups, counters and caches once
+        blogs_bulk_changed.send(sender=Blog, created=posts)
+        return len(posts), skipped
+
+    def build_post(self, row):
+        title = text_field(row, 'title').strip()
+        content = text_field(row, 'content')
+        if not title or not content:
+            raise ValueError("title and content are required")
+        if len(title) > Blog._meta.get_field('title').max_length:
+            raise ValueError("title is too long")
+
+        status = text_field(row, 'status') or self.options['status']
+        if status not in dict(STATUS_CHOICES):
+            raise ValueError(f"unknown status {status!r}")
+
+        created_at = self.parse_date(text_field(row, 'created_at')) or timezone.now()
+        is_featured = row.get('is_featured') or False
+        if isinstance(is_featured, str):
+            is_featured = is_featured.strip().lower() in TRUE_VALUES
+
+        blog = Blog(
+            title=title,
+            content=content,
+            short_desc=text_field(row, 'short_desc') or content[:200],
+            category_id=self.category_id(text_field(row, 'category') or self.options['category']),
+            author_id=self.author_id(text_field(row, 'author') or self.options['author']),
+            blog_image=text_field(row, 'blog_image'),
+            status=status,
+            is_featured=bool(is_featured),
+            created_at=created_at,
+            updated_at=self.parse_date(text_field(row, 'updated_at')) or created_at,
+        )
+        rendering.compile_fields(blog)  # bulk_create skips Blog.save()
+        return blog
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"bad date {value!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def author_id(self, username):
+        if not username:
+            raise ValueError("no author (pass --author for a default)")
+        if username not in self.authors:
+            self.authors[username] = User.objects.filter(username=username).values_list('pk', flat=True).first()
+        if self.authors[username] is None:
+            raise ValueError(f"unknown author {username!r}")
+        return self.authors[username]
+
+    def category_id(self, name):
+        if not name:
+            raise ValueError("no category (pass --category for a default)")
+        if name not in self.categories:
+            category, _ = Category.objects.get_or_create(category_name=name)
+            self.categories[name] = category.pk
+        return self.categories[name]
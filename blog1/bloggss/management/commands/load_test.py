@@ -0,0 +1,219 @@
+import json
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from bloggss.benchmark import (
+    WORDS, http_get, isolated_database, run_threads, seed_blogs, seed_categories, seed_users, summarize,
+    wsgi_server,
+)
+from bloggss.models import Blog
+
+
+# endpoint -> (needs a logged-in Manager, most requests in flight at once)
+ENDPOINTS = {
+    'home': (False, None),
+    'search': (False, None),
+    'single_blogs': (False, None),
+    'system_reports': (True, None),
+    # renders every post on one page: ~2GB and ~30s per request at 100k
+    # posts, so several at once would only measure the OOM killer
+    'posts_list': (True, 1),
+}
+HOST = '127.0.0.1'
+
+
+COMPARED = ('requests_per_sec', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_cold', 'queries_warm', 'errors')
+
+
+def compare(baseline, current):
+    """{endpoint: {metric: (before, now)}} for the numbers that changed between two --output files."""
+    changes = {}
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before:
+            changes[name] = {key: (before.get(key), now.get(key))
+                             for key in COMPARED if before.get(key) != now.get(key)}
+    return changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large dataset (posts, users in every role, categories) and drive the main views "
+        "concurrently; reports throughput, p50/p95/p99 latency and queries per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=300)
+        parser.add_argument('--driver', choices=('client', 'wsgi'), default='client',
+                            help="Django test client in threads, or real HTTP against a local threaded WSGI server")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=300, help="Requests per endpoint (default 300)")
+        parser.add_argument('--max-seconds', type=float, default=30,
+                            help="Stop an endpoint early after this long (default 30)")
+        parser.add_argument('--endpoints', nargs='+', choices=tuple(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Use a dummy cache so every request renders (default: warm local cache)")
+        parser.add_argument('--label', default='', help="Name of this build, stored in the output")
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--compare', help="A previous --output file to show the changes against")
+        parser.add_argument('--json', action='store_true', help="Print machine readable results")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read {options['compare']}: {exc}")
+
+        cache_settings = {}
+        if options['no_cache']:
+            cache_settings['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        results = {
+            'meta': {
+                'label': options['label'],
+                'posts': options['posts'],
+                'users': options['users'],
+                'categories': options['categories'],
+                'driver': options['driver'],
+                'concurrency': options['concurrency'],
+                'requests_per_endpoint': options['requests'],
+                'cache': not options['no_cache'],
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+            },
+            'endpoints': {},
+        }
+
+        with isolated_database(on_disk=True):
+            started = time.perf_counter()
+            self.stderr.write(
+                f"Seeding {options['users']} users, {options['categories']} categories, {options['posts']} posts..."
+            )
+            by_role = seed_users(options['users'])
+            categories = seed_categories(options['categories'])
+            writers = by_role['Author'] + by_role['Editor']
+            seed_blogs(options['posts'], categories=categories, authors=writers)
+            results['meta']['seed_seconds'] = round(time.perf_counter() - started, 1)
+
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver', HOST, 'localhost'], **cache_settings):
+                session_key = self.login(by_role['Manager'][0])
+                mix = self.request_mix()
+                for name in options['endpoints']:
+                    self.stderr.write(f"  {name}...")
+                    login, max_concurrency = ENDPOINTS[name]
+                    concurrency = min(options['concurrency'], max_concurrency or options['concurrency'])
+                    cookie = session_key if login else None
+                    results['endpoints'][name] = self.run_endpoint(mix[name], cookie, concurrency, options)
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+
+        if options['json']:
+            self.stdout.write(output)
+            return
+
+        self.stdout.write(
+            f"{'endpoint':<15} {'conc':>5} {'reqs':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'q cold':>7} {'q warm':>7} {'errors':>7}"
+        )
+        for name, row in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<15} {row['concurrency']:>5} {row['count']:>6} {row['requests_per_sec']:>9.1f} {row['p50_ms']:>9.2f} "
+                f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['queries_cold']:>7} "
+                f"{row['queries_warm']:>7.1f} {row['errors']:>7}"
+            )
+
+        if baseline:
+            self.stdout.write(f"\nChanges against {options['compare']} ({baseline.get('meta', {}).get('label') or 'no label'}):")
+            for name, changed in compare(baseline, results).items():
+                changes = ', '.join(f"{key} {before} -> {now}" for key, (before, now) in changed.items())
+                self.stdout.write(f"  {name:<15} {changes or 'no change'}")
+
+    def login(self, user):
+        """A session for `user`, shared by every worker (they only read it)."""
+        client = Client()
+        client.force_login(user)
+        return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def request_mix(self):
+        """The URLs each endpoint cycles through."""
+        rng = random.Random(0)
+        slugs = list(Blog.objects.published().values_list('slug', flat=True))
+        slugs = rng.sample(slugs, min(200, len(slugs)))  # the same posts every run
+        return {
+            'home': [reverse('home')],
+            'search': [f"{reverse('search')}?keyword={rng.choice(WORDS)}" for _ in range(50)],
+            'single_blogs': [reverse('single_blogs', args=[slug]) for slug in slugs],
+            'system_reports': [reverse('system_reports')],
+            'posts_list': [reverse('posts_list')],
+        }
+
+    def count_queries(self, urls, cookie):
+        """Queries for a first (cold cache) request and the mean over a warm pass, one thread."""
+        client = self.make_client(cookie)
+        cache.clear()
+        with CaptureQueriesContext(connection) as cold:
+            client.get(urls[0])
+        warm = []
+        for url in urls[:5]:
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            warm.append(len(queries))
+        return len(cold), round(statistics.fmean(warm), 1)
+
+    def make_client(self, cookie):
+        client = Client(raise_request_exception=False)
+        if cookie:
+            client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+        return client
+
+    def run_endpoint(self, urls, cookie, concurrency, options):
+        queries_cold, queries_warm = self.count_queries(urls, cookie)
+
+        if options['driver'] == 'client':
+            def get():
+                client = self.make_client(cookie)
+                return lambda url: client.get(url).status_code
+
+            latencies, errors, elapsed = run_threads(
+                get, urls, options['requests'], concurrency, options['max_seconds'],
+            )
+        else:
+            headers = {'Host': HOST}
+            if cookie:
+                headers['Cookie'] = f"{settings.SESSION_COOKIE_NAME}={cookie}"
+            with wsgi_server(WSGIHandler(), HOST) as port:
+                latencies, errors, elapsed = run_threads(
+                    lambda: lambda url: http_get(HOST, port, url, headers),
+                    urls, options['requests'], concurrency, options['max_seconds'],
+                )
+
+        row = {
+            'concurrency': concurrency,
+            'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'errors': errors,
+            'queries_cold': queries_cold,
+            'queries_warm': queries_warm,
+        }
+        row.update(summarize(latencies))
+        return row
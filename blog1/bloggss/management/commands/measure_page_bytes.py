@@ -0,0 +1,96 @@
+import json
+import re
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from bloggss.benchmark import isolated_database, seed_blogs
+from bloggss.models import Blog, Category
+from bloggss.staticfiles import IMMUTABLE
+
+
+# how static files were collected and requested before/after hashing + compression
+SETUPS = (
+    ('before', 'django.contrib.staticfiles.storage.StaticFilesStorage', 'identity'),
+    ('after', 'bloggss.staticfiles.CompressedManifestStaticFilesStorage', 'br, gzip'),
+)
+
+_ASSET = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+class Command(BaseCommand):
+    help = "Bytes and requests per page view (HTML + local static assets), plain vs hashed/precompressed static files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Print machine readable results")
+
+    def handle(self, *args, **options):
+        results = []
+        with isolated_database():
+            seed_blogs(50)
+            pages = [
+                '/',
+                f'/category/{Category.objects.order_by("pk").first().pk}/',
+                f'/blogs/{Blog.objects.order_by("pk").first().slug}/',
+                '/search/?keyword=django',
+            ]
+            for setup, backend, accept_encoding in SETUPS:
+                with tempfile.TemporaryDirectory() as static_root, override_settings(
+                    DEBUG=False,
+                    ALLOWED_HOSTS=['testserver'],
+                    STATIC_ROOT=static_root,
+                    STORAGES={
+                        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                        'staticfiles': {'BACKEND': backend},
+                    },
+                ):
+                    call_command('collectstatic', interactive=False, verbosity=0)
+                    cache.clear()  # cached pages still name the other setup's files
+                    client = Client(headers={'accept-encoding': accept_encoding})
+                    for page in pages:
+                        results.append(dict(setup=setup, page=page, **self.page_view(client, page)))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'page':<24} {'setup':<7} {'html':>7} {'assets':>8} {'first view':>11} "
+            f"{'repeat view':>12} {'repeat reqs':>12}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['page']:<24} {row['setup']:<7} {row['html_bytes']:>7} {row['asset_bytes']:>8} "
+                f"{row['first_view_bytes']:>11} {row['repeat_view_bytes']:>12} {row['repeat_view_requests']:>12}"
+            )
+
+    def page_view(self, client, page):
+        """
+        Body bytes of a first visit (empty cache) and of a second visit where
+        the browser revalidates anything not marked immutable (304, no body).
+        """
+        response = client.get(page)
+        html = response.content
+        assets = sorted(set(_ASSET.findall(html.decode())))
+
+        asset_bytes = 0
+        repeat_requests = 1  # the page itself
+        for url in assets:
+            asset = client.get(url)
+            if asset.status_code != 200:
+                raise RuntimeError(f"{url}: {asset.status_code}")
+            asset_bytes += len(b''.join(asset.streaming_content))
+            if asset.get('Cache-Control') != IMMUTABLE:
+                repeat_requests += 1
+        return {
+            'html_bytes': len(html),
+            'assets': len(assets),
+            'asset_bytes': asset_bytes,
+            'first_view_bytes': len(html) + asset_bytes,
+            'repeat_view_bytes': len(html),
+            'repeat_view_requests': repeat_requests,
+        }
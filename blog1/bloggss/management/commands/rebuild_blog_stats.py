@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bloggss import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the BlogDailyStats rollup table from the Blog table"
+
+    def handle(self, *args, **options):
+        days = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily stats ({days} days)."))
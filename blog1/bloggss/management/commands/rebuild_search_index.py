@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bloggss import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FTS5 search index for blog posts in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Number of posts indexed per transaction (default 1000)")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("The FTS5 search index is only used on SQLite.")
+
+        # (re)create the table and triggers if they are missing
+        search.create_index(connection)
+
+        def progress(done):
+            self.stdout.write(f"  indexed {done} posts")
+
+        total = search.rebuild_index(
+            chunk_size=options['chunk_size'], using=connection, progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({total} posts)."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bloggss import counters
+
+
+class Command(BaseCommand):
+    help = "Correct drift in the dashboard counters by recounting their tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Counters to reconcile (default: all)")
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(counters.counted_models())
+        if unknown:
+            raise CommandError(f"Unknown counter(s): {', '.join(sorted(unknown))}")
+
+        drift = counters.reconcile(options['names'] or None)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All counters are accurate."))
+            return
+        for name, (stored, exact) in drift.items():
+            self.stdout.write(f"  {name}: {stored} -> {exact}")
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {len(drift)} counter(s)."))
@@ -0,0 +1,206 @@
+"""
+Serving uploads (MEDIA_ROOT) without tying up a Python worker.
+
+Django always checks the request (a safe path inside MEDIA_ROOT, a real
+file, GET/HEAD) and then, depending on BLOG_MEDIA_SERVING:
+
+* "x-accel"    - answers with an empty response and an X-Accel-Redirect
+                 header, nginx sends the file from an internal location
+                 (BLOG_MEDIA_ACCEL_PREFIX, see the example below).
+* "x-sendfile" - the same with an X-Sendfile header (Apache mod_xsendfile,
+                 lighttpd), which takes the absolute path.
+* "django"     - sends the file itself: ETag/Last-Modified with 304/412
+                 answers to conditional requests, single byte Range
+                 requests (206/416), and a FileResponse that WSGI servers
+                 with wsgi.file_wrapper (gunicorn) turn into sendfile(),
+                 so the bytes never pass through Python.
+* "off"        - no /media/ URL at all, the front server maps it straight
+                 to MEDIA_ROOT.
+
+nginx, for "x-accel":
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/blog1/media/;
+        expires 1d;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+MODES = ('django', 'x-accel', 'x-sendfile', 'off')
+MEDIA_MAX_AGE = 60 * 60 * 24  # the storage never reuses a file name
+BLOCK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def serving_mode():
+    mode = getattr(settings, 'BLOG_MEDIA_SERVING', 'django')
+    if mode not in MODES:
+        raise ValueError(f"BLOG_MEDIA_SERVING must be one of {MODES}, not {mode!r}")
+    return mode
+
+
+def accel_prefix():
+    return getattr(settings, 'BLOG_MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+
+def media_urlpatterns():
+    """The /media/ route for Blog/urls.py (none when the front server serves it)."""
+    if serving_mode() == 'off':
+        return []
+    prefix = settings.MEDIA_URL.lstrip('/')
+    return [re_path(rf'^{re.escape(prefix)}(?P<path>.+)$', serve_media, name='media')]
+
+
+def resolve(path, root=None):
+    """The absolute file for a /media/ path (or one under `root`), or Http404."""
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404("Hidden file")
+    try:
+        full_path = safe_join(root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Outside the served directory")
+    if not os.path.isfile(full_path):
+        raise Http404("No such file")
+    return full_path
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to send the whole
+    file (no/unsupported header), or False if the range can't be satisfied.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None  # multiple ranges, other units, garbage: whole file is allowed
+    if size == 0:
+        return False  # an empty file has no bytes to pick
+    first, last = match.groups()
+    if first == '':
+        # "bytes=-500": the last 500 bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class FileRange:
+    """
+    Part of an open file, for FileResponse. Reads stop at the end of the
+    range; fileno() lets a sendfile() file_wrapper start at the current
+    offset and send Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _validators(stat):
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return etag, int(stat.st_mtime)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag  # strong comparison only
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def file_response(request, full_path, content_type=None):
+    """Send a file from Python, with conditional GET and Range support."""
+    stat = os.stat(full_path)
+    size = stat.st_size
+    etag, last_modified = _validators(stat)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        if not_modified.status_code == 304:
+            # a 304 carries the validators the cache should store
+            not_modified['ETag'] = etag
+            not_modified['Last-Modified'] = http_date(last_modified)
+        return not_modified  # 304 or 412
+
+    span = None
+    if _if_range_matches(request, etag, last_modified):
+        span = parse_range(request.headers.get('Range'), size)
+    if span is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = span or (0, size - 1)
+    length = max(0, end - start + 1)
+    response = FileResponse(
+        FileRange(open(full_path, 'rb'), start, length),
+        status=206 if span else 200,
+        content_type=content_type,
+    )
+    response.block_size = BLOCK_SIZE
+    response['Content-Length'] = length
+    if span:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    full_path = resolve(path)
+    mode = serving_mode()
+
+    if mode == 'x-accel':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = accel_prefix() + quote(path)
+    elif mode == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+    else:
+        response = file_response(request, full_path)
+
+    if response.status_code in (200, 206, 304):
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}'
+    if mode != 'django':
+        # the proxy fills in length/validators, Django only names the type
+        content_type, _ = mimetypes.guess_type(full_path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    return response
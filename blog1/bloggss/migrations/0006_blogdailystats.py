@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_stats(apps, schema_editor):
+    Blog = apps.get_model('bloggss', 'Blog')
+    BlogDailyStats = apps.get_model('bloggss', 'BlogDailyStats')
+    rows = (
+        Blog.objects.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(created=Count('id'), published=Count('id', filter=Q(status='published')))
+    )
+    BlogDailyStats.objects.bulk_create([
+        BlogDailyStats(day=row['day'], created_count=row['created'], published_count=row['published'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0005_blog_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('created_count', models.IntegerField(default=0)),
+                ('published_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Blog daily stats',
+                'verbose_name_plural': 'Blog daily stats',
+            },
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
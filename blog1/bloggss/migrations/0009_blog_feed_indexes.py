@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0008_blog_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('is_featured', True), ('status', 'published')), fields=['updated_at'], name='blog_featured_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('is_featured', False), ('status', 'published')), fields=['updated_at'], name='blog_home_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['category', 'status', 'updated_at'], name='blog_cat_status_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['updated_at'], name='blog_updated_idx'),
+        ),
+    ]
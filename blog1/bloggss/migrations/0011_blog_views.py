@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0010_blog_related'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
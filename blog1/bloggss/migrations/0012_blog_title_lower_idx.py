@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:19
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0011_blog_views'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='blog_title_lower_idx'),
+        ),
+    ]
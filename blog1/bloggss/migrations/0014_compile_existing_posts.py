@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from bloggss import rendering
+
+
+def compile_existing_posts(apps, schema_editor):
+    """0013 added the stored fields empty: fill them in for the posts already there."""
+    Blog = apps.get_model('bloggss', 'Blog')
+    rendering.compile_rows(Blog.objects.using(schema_editor.connection.alias).filter(content_html=''))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0013_blog_compiled_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(compile_existing_posts, migrations.RunPython.noop),
+    ]
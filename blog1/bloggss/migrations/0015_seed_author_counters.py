@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def seed_author_counters(apps, schema_editor):
+    """One "posts-by:<author id>" counter per author with posts (see counters.py)."""
+    Blog = apps.get_model('bloggss', 'Blog')
+    Counter = apps.get_model('bloggss', 'Counter')
+    db = schema_editor.connection.alias
+    rows = Blog.objects.using(db).order_by().values('author_id').annotate(posts=Count('id')).values_list('author_id', 'posts')
+    Counter.objects.using(db).bulk_create(
+        [Counter(name=f'posts-by:{author_id}', value=posts) for author_id, posts in rows],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloggss', '0014_compile_existing_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_author_counters, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+
+from . import rendering
 
 
 # Create your models here.
@@ -22,6 +26,37 @@ STATUS_CHOICES = (
     ('draft', 'Draft'),
     ('published', 'Published'),
 )
+
+
+class BlogQuerySet(models.QuerySet):
+    """
+    Projections for the two ways posts are shown.
+
+    listing() - cards in feeds, search and the dashboard: joins author and
+                category in the same query and skips the heavy columns
+                (content, image data) the list templates never render.
+    detail()  - a full post page: everything, plus author and category.
+    """
+    LISTING_FIELDS = (
+        'id', 'title', 'slug', 'short_desc', 'excerpt', 'reading_time',
+        'status', 'is_featured', 'views', 'created_at', 'updated_at',
+        'author__id', 'author__username',
+        'category__id', 'category__category_name',
+    )
+
+    def published(self):
+        return self.filter(status='published')
+
+    def listing(self):
+        return self.select_related('author', 'category').only(*self.LISTING_FIELDS)
+
+    def detail(self):
+        return self.select_related('author', 'category')
+
+    def related_to(self, blog):
+        """The precomputed related posts of `blog` (RelatedBlog), best first."""
+        return self.filter(recommended_in__blog=blog).order_by('recommended_in__rank')
+
     
 class Blog(models.Model):
     """
@@ -33,15 +68,125 @@ class Blog(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     blog_image = models.ImageField(upload_to='uploads/%Y/%m/%d')
+    # filled in by the image pipeline (images.py)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=list, blank=True, editable=False)
+    # when related.py last worked out this post's related posts
+    related_computed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # page views, written in batches by hits.py
+    views = models.PositiveBigIntegerField(default=0, editable=False)
     short_desc = models.TextField(max_length=500)
+    # worked out from content/short_desc on save (rendering.py)
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)  # minutes
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default="drafted")
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BlogQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Blog"
         verbose_name_plural = "Blogs"
+        # Match the real access patterns: the public feeds filter on status
+        # (+ featured or category) and page newest first on (updated_at, id).
+        # updated_at is ascending on purpose: SQLite appends the rowid (ASC) to
+        # every index, so walking it backwards yields "updated_at DESC, id DESC".
+        # The feeds are partial indexes because SQLite compares booleans as a
+        # bare "is_featured" term, which a plain composite index can't seek on.
+        indexes = [
+            models.Index(fields=['updated_at'], name='blog_featured_feed_idx',
+                         condition=models.Q(status='published', is_featured=True)),
+            models.Index(fields=['updated_at'], name='blog_home_feed_idx',
+                         condition=models.Q(status='published', is_featured=False)),
+            models.Index(fields=['category', 'status', 'updated_at'], name='blog_cat_status_upd_idx'),
+            models.Index(fields=['updated_at'], name='blog_updated_idx'),
+            # the admin's title search is a range on lower(title), see admin.py
+            models.Index(Lower('title'), name='blog_title_lower_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        # keep content_html/excerpt/word_count/reading_time in step with their sources
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            rendering.compile_fields(self)
+        else:
+            sources = [field for field in rendering.DERIVED_FIELDS if field in update_fields]
+            if sources:
+                kwargs['update_fields'] = set(update_fields) | rendering.compile_fields(self, sources)
+        super().save(*args, **kwargs)
+
+    def _srcset(self, fmt):
+        return ", ".join(
+            f"{default_storage.url(variant[fmt])} {variant['width']}w"
+            for variant in self.image_variants
+        )
+
+    @property
+    def image_srcset(self):
+        """JPEG srcset built from the pipeline's derivatives ('' until they exist)."""
+        return self._srcset('jpeg')
+
+    @property
+    def image_srcset_webp(self):
+        return self._srcset('webp')
+
+
+class BlogDailyStats(models.Model):
+    """
+    Per-day rollup of posts (by the day they were created), kept up to date by
+    the signals in stats.py so system reports never have to count Blog rows.
+    """
+    day = models.DateField(unique=True)
+    created_count = models.IntegerField(default=0)
+    published_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Blog daily stats"
+        verbose_name_plural = "Blog daily stats"
+
+    def __str__(self):
+        return f"{self.day}: {self.created_count} posts"
+
+
+class Counter(models.Model):
+    """
+    Named running totals (posts, categories, users, posts per author) for the dashboards.
+    Updated with F() expressions from signals in counters.py, so reading a
+    total is a primary-key lookup instead of a COUNT(*) over the table.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class RelatedBlog(models.Model):
+    """
+    Precomputed "related posts" (TF-IDF cosine neighbours, see related.py).
+    One row per (post, rank), so a post page reads its list with a single
+    indexed query.
+    """
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = "Related blog"
+        verbose_name_plural = "Related blogs"
+        constraints = [
+            models.UniqueConstraint(fields=['blog', 'rank'], name='related_blog_rank_uniq'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.blog_id} -> {self.related_id} ({self.score:.2f})"
@@ -0,0 +1,276 @@
+"""
+Helpers for caching whole rendered pages.
+
+Only anonymous GET/HEAD requests without pending flash messages are served
+from the page caches: anything else (the header shows the user's dashboard
+link, messages are one-off) is rendered normally.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+
+from assign.models import About, FollowUs
+from .cache import aget_versions, get_versions, model_version_name
+from .models import Blog, Category
+
+
+logger = logging.getLogger(__name__)
+
+def has_pending_messages(request):
+    return bool(len(get_messages(request)))
+
+
+def is_cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # for a visitor without a session cookie this doesn't touch the database
+    if request.user.is_authenticated:
+        return False
+    return not has_pending_messages(request)
+
+
+async def ais_cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # auser() loads the session too, so the messages check below is safe
+    if (await request.auser()).is_authenticated:
+        return False
+    return not has_pending_messages(request)
+
+
+SIDEBAR_MODELS = (Category, About, FollowUs)
+
+
+def _tag(versions):
+    return f"{timezone.localdate():%Y%m%d}." + '.'.join(str(v) for v in versions)
+
+
+def page_tag():
+    """
+    Everything outside the view's own data that changes the rendered page:
+    the sidebar/nav models (categories, about, follow us) and the date shown
+    in the top bar.
+    """
+    return _tag(get_versions(*[model_version_name(m) for m in SIDEBAR_MODELS]))
+
+
+async def apage_tag():
+    return _tag(await aget_versions(*[model_version_name(m) for m in SIDEBAR_MODELS]))
+
+
+# ---------- single post pages ----------
+
+META_TIMEOUT = 60 * 60 * 24
+PAGE_TIMEOUT = 60 * 60
+
+
+def _meta_key(slug):
+    return f'bloggss:post-meta:{slug}'
+
+
+def post_meta(slug):
+    """
+    {'id', 'updated_at', 'rev'} of the published post with this slug, or None.
+    Cached until the post is saved or deleted (see forget_post), so a warm
+    hit doesn't query the database at all.
+    """
+    key = _meta_key(slug)
+    meta = cache.get(key)
+    if meta is None:
+        meta = _meta_query(slug).first()
+        if meta is None:
+            return None
+        _stamp(meta)
+        cache.set(key, meta, META_TIMEOUT)
+    return meta
+
+
+async def apost_meta(slug):
+    key = _meta_key(slug)
+    meta = await cache.aget(key)
+    if meta is None:
+        meta = await _meta_query(slug).afirst()
+        if meta is None:
+            return None
+        _stamp(meta)
+        await cache.aset(key, meta, META_TIMEOUT)
+    return meta
+
+
+def _meta_query(slug):
+    return Blog.objects.filter(slug=slug, status='published').values('id', 'updated_at')
+
+
+def _stamp(meta):
+    # rev changes every time the entry is rebuilt, so forgetting the meta
+    # also retires the rendered page even if updated_at didn't move
+    meta['rev'] = time.time_ns()
+
+
+def forget_post(*slugs):
+    cache.delete_many([_meta_key(slug) for slug in slugs if slug])
+
+
+def post_page_key(slug, meta, tag=None):
+    """Pass `tag` (from apage_tag()) when calling from async code."""
+    tag = tag or page_tag()
+    return f"bloggss:post-page:{slug}:{meta['updated_at'].timestamp()}:{meta['rev']}:{tag}"
+
+
+# ---------- stale-while-revalidate full pages ----------
+
+def start_refresh(target):
+    """Run target in a daemon thread (tests patch this to run it inline)."""
+    def run():
+        try:
+            target()
+        finally:
+            # the thread opened its own connection, nobody else will close it
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _swr_entry(response, tag, fresh_for):
+    return {
+        'content': response.content,
+        'content_type': response.headers['Content-Type'],
+        'tag': tag,
+        'fresh_until': time.time() + fresh_for,
+    }
+
+
+def _storable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _is_stale(entry, tag):
+    return entry['tag'] != tag or entry['fresh_until'] < time.time()
+
+
+def _finish(response, state):
+    response.headers['X-Page-Cache'] = state
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _refresh_in_background(key, render_and_store, request):
+    """Re-render a copy of the request off the request path, then release the lock."""
+    lock = key + ':refreshing'
+    background = copy.copy(request)
+
+    def refresh():
+        try:
+            render_and_store(background)
+        except Exception:
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            cache.delete(lock)
+
+    start_refresh(refresh)
+
+
+def swr_key(name, request, params, args=(), kwargs=None):
+    """
+    The entry for this view and the query parameters it actually reads.
+    Anything else (?utm_source=..., cache busters) shares the entry, so
+    made-up query strings can't fill the cache and push real pages out.
+    """
+    query = urlencode(sorted((param, request.GET.get(param)) for param in params if param in request.GET))
+    varying = repr((args, sorted((kwargs or {}).items()), query))
+    return f"bloggss:swr:{name}:{hashlib.md5(varying.encode()).hexdigest()}"
+
+
+def swr_cache_page(name, fresh_for=60, stale_for=10 * 60, models=(Blog,), params=()):
+    """
+    Full-page cache for anonymous visitors with stale-while-revalidate.
+
+    A fresh entry is served as is. Once it is older than `fresh_for` seconds,
+    or one of `models` / the sidebar changed, it is still served, and the
+    first request to notice takes a lock and re-renders the page in a
+    background thread. Everyone else keeps getting the stale copy, so
+    expiry never sends a burst of traffic to the database. Entries are
+    dropped completely after fresh_for + stale_for.
+
+    `params` are the query parameters the view reads (e.g. 'cursor'), the
+    only part of the query string that gets its own entry.
+
+    Works on sync and async views.
+    """
+    version_names = [model_version_name(m) for m in models]
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_swr(view, name, fresh_for, stale_for, version_names, params)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                response = view(request, *args, **kwargs)
+                patch_vary_headers(response, ['Cookie'])
+                return response
+
+            key = swr_key(name, request, params, args, kwargs)
+            tag = page_tag() + ':' + '.'.join(str(v) for v in get_versions(*version_names))
+
+            def render_and_store(req):
+                response = view(req, *args, **kwargs)
+                if _storable(response):
+                    cache.set(key, _swr_entry(response, tag, fresh_for), fresh_for + stale_for)
+                return response
+
+            entry = cache.get(key)
+            if entry is None:
+                return _finish(render_and_store(request), 'miss')
+
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            if not _is_stale(entry, tag):
+                return _finish(response, 'hit')
+            if cache.add(key + ':refreshing', 1, 30):
+                _refresh_in_background(key, render_and_store, request)
+            return _finish(response, 'stale')
+        return wrapper
+    return decorator
+
+
+def _async_swr(view, name, fresh_for, stale_for, version_names, params):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await ais_cacheable(request):
+            response = await view(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        key = swr_key(name, request, params, args, kwargs)
+        tag = await apage_tag() + ':' + '.'.join(str(v) for v in await aget_versions(*version_names))
+
+        async def render_and_store(req):
+            response = await view(req, *args, **kwargs)
+            if _storable(response):
+                await cache.aset(key, _swr_entry(response, tag, fresh_for), fresh_for + stale_for)
+            return response
+
+        entry = await cache.aget(key)
+        if entry is None:
+            return _finish(await render_and_store(request), 'miss')
+
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        if not _is_stale(entry, tag):
+            return _finish(response, 'hit')
+        if await cache.aadd(key + ':refreshing', 1, 30):
+            # the refresh thread runs its own event loop
+            _refresh_in_background(key, async_to_sync(render_and_store), request)
+        return _finish(response, 'stale')
+    return wrapper
@@ -0,0 +1,157 @@
+"""
+Keyset (cursor) pagination for the public post feeds.
+
+Pages are ordered newest first on (updated_at, id) and every page is fetched
+with a WHERE on the last seen key instead of an OFFSET, so page 500 costs the
+same as page 1.
+
+Cursors are opaque url-safe strings: "n" cursors walk to older posts,
+"p" cursors walk back to newer ones.
+
+akeyset_paginate() / aget_page() are the same thing for the async views.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q, QuerySet
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, blog):
+    raw = f"{direction}|{blog.updated_at.isoformat()}|{blog.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (direction, updated_at, id) or None for a missing/garbled cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, updated_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, datetime.fromisoformat(updated_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _page_rows(queryset, key, per_page):
+    """The query for one page (+1 row) in the direction of the cursor."""
+    if key is None:
+        return queryset.order_by('-updated_at', '-id')[:per_page + 1]
+
+    direction, updated_at, pk = key
+    if direction == NEXT:
+        # older than the cursor
+        older = Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk)
+        return queryset.filter(older).order_by('-updated_at', '-id')[:per_page + 1]
+
+    # newer than the cursor, walked oldest first and flipped back
+    newer = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+    return queryset.filter(newer).order_by('updated_at', 'id')[:per_page + 1]
+
+
+def _make_page(rows, key, per_page):
+    """Build the KeysetPage, or None if a "previous" cursor ran off the start."""
+    has_more, items = len(rows) > per_page, rows[:per_page]
+
+    if key is None:
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(NEXT, items[-1]) if has_more else None,
+        )
+
+    if key[0] == NEXT:
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(NEXT, items[-1]) if has_more else None,
+            prev_cursor=encode_cursor(PREVIOUS, items[0]) if items else None,
+        )
+
+    if not rows:
+        return None
+    items.reverse()
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(NEXT, items[-1]) if items else None,
+        prev_cursor=encode_cursor(PREVIOUS, items[0]) if has_more else None,
+    )
+
+
+def keyset_paginate(queryset, cursor=None, per_page=10):
+    """
+    Return one KeysetPage of `queryset` ordered by -updated_at, -id.
+    Fetches per_page + 1 rows to know if there is another page that way.
+    """
+    key = decode_cursor(cursor)
+    page = _make_page(list(_page_rows(queryset, key, per_page)), key, per_page)
+    if page is None:
+        return keyset_paginate(queryset, None, per_page)
+    return page
+
+
+async def akeyset_paginate(queryset, cursor=None, per_page=10):
+    """keyset_paginate() with the async ORM."""
+    key = decode_cursor(cursor)
+    page = _make_page([row async for row in _page_rows(queryset, key, per_page).aiterator()], key, per_page)
+    if page is None:
+        return await akeyset_paginate(queryset, None, per_page)
+    return page
+
+
+async def aget_page(object_list, per_page, number):
+    """
+    Paginator(object_list, per_page).get_page(number) for async views.
+    object_list is a list, a queryset, or anything with acount() and
+    afetch(start, stop).
+    """
+    paginator = Paginator(object_list, per_page)
+    if isinstance(object_list, (list, tuple)):
+        return paginator.get_page(number)
+    # count is a cached_property, filling it in means Paginator never calls count()
+    paginator.count = await object_list.acount()
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+
+    bottom = (number - 1) * per_page
+    top = min(bottom + per_page, paginator.count)
+    if isinstance(object_list, QuerySet):
+        items = [obj async for obj in object_list[bottom:top].aiterator()]
+    else:
+        items = await object_list.afetch(bottom, top)
+    return Page(items, number, paginator)
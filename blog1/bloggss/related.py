@@ -0,0 +1,210 @@
+"""
+"Related posts" from TF-IDF vectors, computed offline with NumPy.
+
+`manage.py build_related_posts` turns every published post into a TF-IDF
+vector over its title, short description and content (title words count
+the most), then compares posts in blocks of rows with one matrix
+multiplication per block and keeps each post's top-k cosine neighbours in
+the RelatedBlog table. The post page only reads those rows back.
+
+Runs are incremental: only posts saved since their list was last worked out
+get new lists, and an unchanged post picks up a changed one if it now
+belongs in its top-k. The vocabulary/IDF is taken from the whole corpus
+each run, so `--full` now and then recomputes every list from scratch.
+
+NumPy is only needed by the job, not by the site.
+"""
+import math
+import re
+from collections import Counter as TermCounts, defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import page_cache
+from .models import Blog, RelatedBlog
+
+
+TOP_K = 5
+MIN_SCORE = 0.05
+MAX_FEATURES = 4096     # the vectors are dense: posts x features x 4 bytes
+MAX_DOC_FREQUENCY = 0.5  # words in more than half the posts say nothing
+BLOCK_SIZE = 256
+FIELD_WEIGHTS = (('title', 3), ('short_desc', 2), ('content', 1))
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have how i if in into is it its
+    of on or our so that the their then there these this to was we were what
+    when which who will with you your
+""".split())
+
+# two or more word characters starting with a letter (no bare numbers)
+_WORD = re.compile(r'[^\W\d_]\w+')
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(text.casefold()) if word not in STOP_WORDS]
+
+
+def term_counts(post):
+    """Weighted term frequencies of a values() row."""
+    counts = TermCounts()
+    for field, weight in FIELD_WEIGHTS:
+        for word, count in TermCounts(tokenize(post[field] or '')).items():
+            counts[word] += count * weight
+    return counts
+
+
+def _posts():
+    fields = ['id'] + [field for field, _ in FIELD_WEIGHTS]
+    return Blog.objects.published().order_by('pk').values(*fields).iterator(chunk_size=2000)
+
+
+def build_vectors(max_features=MAX_FEATURES):
+    """
+    (post ids, L2-normalised float32 matrix with one row per post).
+    Streams the posts twice (document frequencies, then the rows) instead of
+    keeping every post's terms in memory.
+    """
+    import numpy as np
+
+    ids = []
+    doc_freq = TermCounts()
+    for post in _posts():
+        ids.append(post['id'])
+        doc_freq.update(term_counts(post).keys())
+
+    n_docs = len(ids)
+    limit = max(2, n_docs * MAX_DOC_FREQUENCY)
+    terms = sorted(
+        (term for term, df in doc_freq.items() if 2 <= df <= limit),
+        key=lambda term: (-doc_freq[term], term),
+    )[:max_features]
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    idf = np.array([math.log((1 + n_docs) / (1 + doc_freq[term])) + 1 for term in terms], dtype=np.float32)
+
+    row_of = {pk: i for i, pk in enumerate(ids)}
+    matrix = np.zeros((n_docs, len(terms)), dtype=np.float32)
+    for post in _posts():
+        row = row_of.get(post['id'])
+        if row is None:
+            continue  # published while we were reading
+        weights = [
+            (vocabulary[term], 1 + math.log(count))
+            for term, count in term_counts(post).items() if term in vocabulary
+        ]
+        if weights:
+            columns, values = zip(*weights)
+            matrix[row, list(columns)] = values
+
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return ids, matrix
+
+
+def top_neighbours(matrix, rows, k=TOP_K, block_size=BLOCK_SIZE, min_score=MIN_SCORE):
+    """Yield (row, [(column, score), ...] best first) for each of `rows`."""
+    import numpy as np
+
+    count = min(k, matrix.shape[0] - 1)
+    if count <= 0:
+        for row in rows:
+            yield row, []
+        return
+
+    rows = np.asarray(rows, dtype=np.intp)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        scores = matrix[block] @ matrix.T               # (block, posts) cosine similarities
+        scores[np.arange(len(block)), block] = -1.0     # a post isn't related to itself
+        best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        for row, columns, values in zip(block, best, best_scores):
+            yield int(row), [(int(c), float(v)) for c, v in zip(columns, values) if v >= min_score]
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _stale_ids():
+    return set(Blog.objects.published().filter(
+        Q(related_computed_at__isnull=True) | Q(updated_at__gt=F('related_computed_at'))
+    ).values_list('pk', flat=True))
+
+
+def _current_lists(blog_ids):
+    lists = defaultdict(list)
+    for chunk in _chunks(blog_ids):
+        rows = RelatedBlog.objects.filter(blog__in=chunk).order_by('blog', 'rank')
+        for blog_id, related_id, score in rows.values_list('blog', 'related', 'score'):
+            lists[blog_id].append((related_id, score))
+    return lists
+
+
+def refresh(full=False, k=TOP_K, block_size=BLOCK_SIZE, max_features=MAX_FEATURES, progress=None):
+    """
+    Recompute the related posts of every stale post (all of them if `full`).
+    Returns the number of posts whose list was written.
+    """
+    started = timezone.now()
+    stale = None if full else _stale_ids()
+    if stale is not None and not stale:
+        return 0
+
+    ids, matrix = build_vectors(max_features)
+    rows = [i for i, pk in enumerate(ids) if stale is None or pk in stale]
+
+    lists = {}
+    for done, (row, neighbours) in enumerate(top_neighbours(matrix, rows, k, block_size), 1):
+        lists[ids[row]] = [(ids[column], score) for column, score in neighbours]
+        if progress and done % 1000 == 0:
+            progress(done)
+
+    if not full:
+        # a changed post can push its way into an unchanged neighbour's list,
+        # or drop out of one it used to be in
+        changed = set(lists)
+        affected = {pk for neighbours in lists.values() for pk, _ in neighbours}
+        for chunk in _chunks(changed):
+            affected.update(RelatedBlog.objects.filter(related__in=chunk).values_list('blog', flat=True))
+        affected -= changed
+        merged = _current_lists(affected)
+        before = {pk: list(merged[pk]) for pk in affected}
+        for pk in affected:
+            # old scores of changed posts are stale, their new ones are added below
+            merged[pk] = [(r, s) for r, s in merged[pk] if r not in changed]
+        for source, neighbours in list(lists.items()):
+            for pk, score in neighbours:
+                if pk in affected:
+                    merged[pk].append((source, score))
+        for pk in affected:
+            top = sorted(merged[pk], key=lambda pair: -pair[1])[:k]
+            if top != before[pk]:
+                lists[pk] = top
+
+    with transaction.atomic():
+        if full:
+            RelatedBlog.objects.all().delete()
+        else:
+            for chunk in _chunks(lists):
+                RelatedBlog.objects.filter(blog__in=chunk).delete()
+        RelatedBlog.objects.bulk_create([
+            RelatedBlog(blog_id=source, related_id=pk, rank=rank, score=score)
+            for source, neighbours in lists.items()
+            for rank, (pk, score) in enumerate(neighbours)
+        ], batch_size=1000)
+        for chunk in _chunks(ids[row] for row in rows):
+            Blog.objects.filter(pk__in=chunk).update(related_computed_at=started)
+
+    # the cached post pages show the old lists
+    for chunk in _chunks(lists):
+        page_cache.forget_post(*Blog.objects.filter(pk__in=chunk).values_list('slug', flat=True))
+    return len(lists)
@@ -0,0 +1,85 @@
+"""
+Post text that used to be worked out by template filters on every render.
+
+The body HTML, the listing excerpt, the word count and the reading time are
+computed here once, when the post is saved (Blog.save), and stored on the
+row. Templates print the stored values, so rendering a page costs the same
+however long the post is. Migration 0014 compiles the rows saved before
+these fields existed, and `manage.py backfill_content` does the same for
+rows written since with bulk_create/update().
+"""
+import math
+
+from django.db import transaction
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+EXCERPT_WORDS = 20
+WORDS_PER_MINUTE = 200
+
+# source field -> the stored fields computed from it
+DERIVED_FIELDS = {
+    'content': ('content_html', 'word_count', 'reading_time'),
+    'short_desc': ('excerpt',),
+}
+STORED_FIELDS = ('content_html', 'excerpt', 'word_count', 'reading_time')
+
+
+def content_html(content):
+    """What {{ content|linebreaks }} printed: escaped text in <p>/<br> tags."""
+    return linebreaks(content, autoescape=True)
+
+
+def excerpt(short_desc):
+    """What {{ short_desc|truncatewords:20 }} printed (still plain text)."""
+    return Truncator(short_desc).words(EXCERPT_WORDS, truncate=" …")
+
+
+def word_count(content):
+    return len(content.split())
+
+
+def reading_time(words):
+    """Minutes, never less than one."""
+    return max(1, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def compile_fields(blog, sources=('content', 'short_desc')):
+    """
+    Set the stored fields computed from `sources` on `blog` and return
+    their names. Sources that weren't loaded (deferred) are skipped.
+    """
+    loaded = [field for field in sources if field in blog.__dict__]
+    if 'content' in loaded:
+        blog.content_html = content_html(blog.content or '')
+        blog.word_count = word_count(blog.content or '')
+        blog.reading_time = reading_time(blog.word_count)
+    if 'short_desc' in loaded:
+        blog.excerpt = excerpt(blog.short_desc or '')
+    return {name for field in loaded for name in DERIVED_FIELDS[field]}
+
+
+def compile_rows(posts, batch_size=500, progress=None):
+    """
+    Compile and store the fields of every post in `posts`, a batch per
+    transaction, and return how many there were. Walks by primary key so
+    memory use stays flat. `posts` may come from a migration's historical
+    model, which has no Blog.save() of its own.
+    """
+    posts = posts.order_by('pk').only('pk', 'content', 'short_desc')
+    manager = posts.model._base_manager.db_manager(posts.db)
+    done = last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return done
+        for blog in batch:
+            compile_fields(blog)
+        with transaction.atomic(using=posts.db):
+            # bulk_update leaves updated_at alone: the posts didn't change
+            manager.bulk_update(batch, STORED_FIELDS)
+        done += len(batch)
+        last_pk = batch[-1].pk
+        if progress:
+            progress(done)
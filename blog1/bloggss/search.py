@@ -0,0 +1,269 @@
+"""
+Full-text search for blog posts.
+
+On SQLite the posts are mirrored into an FTS5 virtual table
+(``bloggss_blog_fts``) that is kept in sync by triggers on ``bloggss_blog``,
+so every save/delete (including bulk ones) updates the index. Results are
+ranked with BM25 and come back with a highlighted snippet. Only published
+posts are returned: drafts stay in the index but are filtered out by a join
+on ``bloggss_blog.status``.
+
+On any other database (or if the index is missing) we fall back to the old
+``icontains`` query so the search page keeps working.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Blog
+
+
+FTS_TABLE = 'bloggss_blog_fts'
+
+# BM25 weights for (title, short_desc, content) - a hit in the title counts most
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Markers that can't appear in user content, swapped for <mark> after escaping
+_HL_START = '\x02'
+_HL_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# the FTS rows of published posts that match (the MATCH parameter is filled in)
+_MATCHING = (
+    f'FROM {FTS_TABLE} JOIN bloggss_blog ON bloggss_blog.id = {FTS_TABLE}.rowid '
+    f"WHERE {FTS_TABLE} MATCH %s AND bloggss_blog.status = 'published'"
+)
+
+
+# ---------- index management (used by the migration and the rebuild command) ----------
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, short_desc, content,
+        content='bloggss_blog', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # ORDER BY rank then uses our weights and lets FTS5 do the sorting itself
+    f"""
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank)
+    VALUES ('rank', 'bm25({", ".join(str(w) for w in BM25_WEIGHTS)})')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON bloggss_blog BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, short_desc, content)
+        VALUES (new.id, new.title, new.short_desc, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON bloggss_blog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, short_desc, content)
+        VALUES ('delete', old.id, old.title, old.short_desc, old.content);
+    END
+    """,
+    # Only re-index when a searchable column changes (not on status/featured flips)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, short_desc, content ON bloggss_blog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, short_desc, content)
+        VALUES ('delete', old.id, old.title, old.short_desc, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, short_desc, content)
+        VALUES (new.id, new.title, new.short_desc, new.content);
+    END
+    """,
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def fts_available(using=connection):
+    """True when the database is SQLite and the FTS5 index table exists."""
+    if using.vendor != 'sqlite':
+        return False
+    # Only remember a positive answer, the table can appear later (migrate)
+    if getattr(using, '_bloggss_fts', False):
+        return True
+    using._bloggss_fts = FTS_TABLE in using.introspection.table_names()
+    return using._bloggss_fts
+
+
+def create_index(using=connection):
+    with using.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+
+
+def restore_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate hook. SQLite migrations that rebuild bloggss_blog (most
+    AddField/AlterField operations) drop its triggers along with the old
+    table, so put them back whenever the index table is there.
+    """
+    conn = connections[using]
+    if conn.vendor == 'sqlite' and FTS_TABLE in conn.introspection.table_names():
+        create_index(conn)
+
+
+def drop_index(using=connection):
+    using._bloggss_fts = False
+    with using.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_index(chunk_size=1000, using=connection, progress=None):
+    """
+    Re-populate the index from bloggss_blog in id-ordered chunks.
+    Each chunk is its own transaction so the writer lock is never held for long.
+    Returns the number of posts indexed.
+    """
+    with transaction.atomic(using=using.alias):
+        with using.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+
+    last_id = 0
+    total = 0
+    while True:
+        with transaction.atomic(using=using.alias):
+            with using.cursor() as cursor:
+                cursor.execute(
+                    'SELECT MAX(id), COUNT(*) FROM ('
+                    ' SELECT id FROM bloggss_blog WHERE id > %s ORDER BY id LIMIT %s'
+                    ')',
+                    [last_id, chunk_size],
+                )
+                max_id, count = cursor.fetchone()
+                if not count:
+                    break
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE}(rowid, title, short_desc, content) '
+                    'SELECT id, title, short_desc, content FROM bloggss_blog '
+                    'WHERE id > %s AND id <= %s',
+                    [last_id, max_id],
+                )
+        total += count
+        last_id = max_id
+        if progress:
+            progress(total)
+
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+# ---------- querying ----------
+
+def build_match_query(keyword):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word is a prefix so results show up while the user is still typing.
+    Returns '' if there is nothing searchable in the keyword.
+    """
+    tokens = _TOKEN_RE.findall(keyword or '')
+    if not tokens:
+        return ''
+    terms = ['"%s"' % token for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a raw FTS5 snippet and turn our markers into <mark> tags."""
+    html = escape(snippet).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>')
+    return mark_safe(html)
+
+
+class FTSResults:
+    """
+    Lazy, sliceable result set so it can be handed straight to Paginator.
+    Only the requested page is fetched, already ordered by BM25 rank.
+    """
+
+    def __init__(self, keyword, using=connection):
+        self.keyword = keyword
+        self.match = build_match_query(keyword)
+        self.using = using
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            else:
+                with self.using.cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) {_MATCHING}', [self.match])
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+
+        with self.using.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {FTS_TABLE}.rowid, snippet({FTS_TABLE}, -1, %s, %s, %s, 24) '
+                f'{_MATCHING} ORDER BY {FTS_TABLE}.rank LIMIT %s OFFSET %s',
+                [_HL_START, _HL_END, '…', self.match, limit, start],
+            )
+            rows = cursor.fetchall()
+
+        blogs = Blog.objects.listing().in_bulk([row[0] for row in rows])
+        results = []
+        for blog_id, snippet in rows:
+            blog = blogs.get(blog_id)
+            if blog is None:
+                continue
+            blog.snippet = highlight(snippet)
+            results.append(blog)
+        return results
+
+    # Django has no async cursor, so async views run the raw FTS queries
+    # through sync_to_async (the ORM's own async methods do the same)
+    async def acount(self):
+        return await sync_to_async(self.count)()
+
+    async def afetch(self, start, stop):
+        return await sync_to_async(self.__getitem__)(slice(start, stop))
+
+
+def fallback_queryset(keyword):
+    """The original LIKE based search, used when FTS5 isn't available."""
+    return Blog.objects.listing().published().filter(
+        Q(title__icontains=keyword) | Q(short_desc__icontains=keyword) | Q(content__icontains=keyword)
+    ).order_by('-updated_at')
+
+
+def search_blogs(keyword, using=connection):
+    """Return a Paginator-friendly result set for the keyword."""
+    if not keyword:
+        return []
+    if fts_available(using):
+        return FTSResults(keyword, using=using)
+    return fallback_queryset(keyword)
+
+
+async def asearch_blogs(keyword):
+    """search_blogs() for async views (only the default database)."""
+    if not keyword:
+        return []
+    if await sync_to_async(fts_available)():
+        return FTSResults(keyword)
+    return fallback_queryset(keyword)
@@ -0,0 +1,200 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from assign.models import About, FollowUs
+from . import autocomplete, category_counts, counters, page_cache, sitemaps, stats
+from .cache import bump_version, model_version_name
+from .models import Blog, Category
+
+
+# Sent once per batch by code that writes posts in bulk (bulk_create,
+# queryset.update(), a raw DELETE), which never fires post_save/post_delete.
+#   created - the Blog instances that were inserted
+#   updated - the Blog instances as they are now, with _loaded_status,
+#             _loaded_category_id and _loaded_author_id still holding what
+#             they had before
+#   deleted - the Blog instances that were removed
+blogs_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=About)
+@receiver(post_delete, sender=About)
+@receiver(post_save, sender=FollowUs)
+@receiver(post_delete, sender=FollowUs)
+def invalidate_sidebar(sender, **kwargs):
+    """Categories, About and Follow Us feed the sidebar on every page."""
+    bump_version(model_version_name(sender))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        category_counts.add_category(instance.pk)
+
+
+# ---------- Blog ----------
+
+@receiver(post_init, sender=Blog)
+def remember_loaded_state(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred field is never fetched just for this
+    instance._loaded_status = instance.__dict__.get('status')
+    instance._loaded_slug = instance.__dict__.get('slug')
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+
+
+def _loaded_place(blog):
+    """(status, category id) as loaded, or None if either was deferred."""
+    if blog._loaded_status is None or blog._loaded_category_id is None:
+        return None
+    return blog._loaded_status, blog._loaded_category_id
+
+
+@receiver(post_save, sender=Blog)
+def blog_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump_version(model_version_name(Blog))
+    page_cache.forget_post(instance.slug, instance._loaded_slug)
+    sitemaps.forget_chunks(instance.pk)
+    if created:
+        stats.record_created(instance)
+        counters.increment(counters.BLOGS)
+        counters.increment(counters.author_posts(instance.author_id))
+    else:
+        if instance._loaded_status is not None and instance._loaded_status != instance.status:
+            stats.record_status_change(instance, instance._loaded_status)
+        if instance._loaded_author_id is not None and instance._loaded_author_id != instance.author_id:
+            counters.increment(counters.author_posts(instance._loaded_author_id), -1)
+            counters.increment(counters.author_posts(instance.author_id))
+
+    now = (instance.status, instance.category_id)
+    if created:
+        category_counts.adjust(category_counts.changes(None, now))
+    elif _loaded_place(instance):
+        category_counts.adjust(category_counts.changes(_loaded_place(instance), now))
+    else:
+        # loaded with status/category deferred: no idea where it came from
+        category_counts.forget_all()
+    remember_loaded_state(sender, instance)
+
+
+@receiver(post_delete, sender=Blog)
+def blog_deleted(sender, instance, **kwargs):
+    bump_version(model_version_name(Blog))
+    page_cache.forget_post(instance.slug)
+    sitemaps.forget_chunks(instance.pk)
+    stats.record_deleted(instance)
+    counters.increment(counters.BLOGS, -1)
+    counters.increment(counters.author_posts(instance.author_id), -1)
+    category_counts.adjust(category_counts.changes((instance.status, instance.category_id), None))
+
+
+@receiver(blogs_bulk_changed)
+def blogs_changed_in_bulk(sender, created=(), updated=(), deleted=(), **kwargs):
+    """Same bookkeeping as blog_saved/blog_deleted, but once for the whole batch."""
+    bump_version(model_version_name(Blog))
+    per_day = defaultdict(lambda: [0, 0])
+    for blog in created:
+        day = per_day[stats.day_of(blog.created_at)]
+        day[0] += 1
+        day[1] += int(stats.is_published(blog.status))
+    for blog in updated:
+        if blog._loaded_status is not None:
+            day = per_day[stats.day_of(blog.created_at)]
+            day[1] += int(stats.is_published(blog.status)) - int(stats.is_published(blog._loaded_status))
+    for blog in deleted:
+        day = per_day[stats.day_of(blog.created_at)]
+        day[0] -= 1
+        day[1] -= int(stats.is_published(blog.status))
+    for day, (created_count, published_count) in per_day.items():
+        stats.adjust(day, created=created_count, published=published_count)
+
+    if len(created) != len(deleted):
+        counters.increment(counters.BLOGS, len(created) - len(deleted))
+    per_author = defaultdict(int)
+    for blog in created:
+        per_author[blog.author_id] += 1
+    for blog in updated:
+        if blog._loaded_author_id is not None and blog._loaded_author_id != blog.author_id:
+            per_author[blog._loaded_author_id] -= 1
+            per_author[blog.author_id] += 1
+    for blog in deleted:
+        per_author[blog.author_id] -= 1
+    for author_id, delta in per_author.items():
+        if delta:
+            counters.increment(counters.author_posts(author_id), delta)
+
+    per_category = defaultdict(int)
+    moves = [(None, (blog.status, blog.category_id)) for blog in created]
+    moves += [(_loaded_place(blog), (blog.status, blog.category_id)) for blog in updated if _loaded_place(blog)]
+    moves += [((blog.status, blog.category_id), None) for blog in deleted]
+    for before, after in moves:
+        for pk, delta in category_counts.changes(before, after).items():
+            per_category[pk] += delta
+    category_counts.adjust(per_category)
+    if any(_loaded_place(blog) is None for blog in updated):
+        category_counts.forget_all()
+    page_cache.forget_post(*[blog.slug for blog in [*updated, *deleted]])
+    sitemaps.forget_chunks(*[blog.pk for blog in [*created, *updated, *deleted]])
+    for blog in updated:
+        remember_loaded_state(sender, blog)
+
+
+# ---------- autocomplete ----------
+# Connected after the receivers above, so the cache versions are already
+# bumped and the index can record them as seen.
+
+@receiver(post_save, sender=Blog)
+def autocomplete_post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.index.update_post(instance)
+
+
+@receiver(post_delete, sender=Blog)
+def autocomplete_post_deleted(sender, instance, **kwargs):
+    autocomplete.index.remove_post(instance.pk)
+
+
+@receiver(blogs_bulk_changed)
+def autocomplete_posts_changed_in_bulk(sender, created=(), updated=(), deleted=(), **kwargs):
+    if created:
+        return  # the version bump above makes the next lookup rebuild with them
+    autocomplete.index.update_posts(updated, removed=[blog.pk for blog in deleted])
+
+
+@receiver(post_save, sender=Category)
+def autocomplete_category_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.index.update_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def autocomplete_category_deleted(sender, instance, **kwargs):
+    autocomplete.index.update_category(instance, deleted=True)
+
+
+# ---------- dashboard counters ----------
+
+COUNTER_FOR = {
+    'bloggss.category': counters.CATEGORIES,
+    settings.AUTH_USER_MODEL.lower(): counters.USERS,
+}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_created(sender, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment(COUNTER_FOR[sender._meta.label_lower])
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def count_deleted(sender, **kwargs):
+    counters.increment(COUNTER_FOR[sender._meta.label_lower], -1)
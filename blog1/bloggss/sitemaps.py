@@ -0,0 +1,121 @@
+"""
+Sitemap index with one child sitemap per block of post ids.
+
+Posts are split into chunks by primary key (ids 1-5000 are posts-0, 5001-10000
+posts-1, ...), so a post always lives in the same chunk. Each chunk is built
+by streaming its rows with .iterator(chunk_size=...) and the XML is cached
+under a version key of its own: saving or deleting a post only bumps the
+version of its chunk (see signals.py), every other chunk stays cached.
+
+The index itself (one grouped query for the per-chunk lastmod) and the
+categories sitemap are cached against the Blog/Category versions.
+"""
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Max
+from django.urls import reverse
+
+from .cache import bump_version, cached, get_versions
+from .models import Blog, Category
+
+
+SITEMAP_TIMEOUT = 60 * 60 * 24
+ITERATOR_CHUNK_SIZE = 2000
+
+URLSET_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_TAIL = '</urlset>\n'
+
+
+def chunk_size():
+    # the protocol allows 50k URLs per sitemap, smaller chunks are cheaper to rebuild
+    return getattr(settings, 'SITEMAP_CHUNK_SIZE', 5000)
+
+
+def chunk_of(pk):
+    return (pk - 1) // chunk_size()
+
+
+def _chunk_version_name(chunk):
+    return f'bloggss.sitemap.posts-{chunk}'
+
+
+def forget_chunks(*pks):
+    """Retire the cached chunk(s) holding these posts."""
+    for chunk in {chunk_of(pk) for pk in pks if pk}:
+        bump_version(_chunk_version_name(chunk))
+
+
+def _url(loc, lastmod=None):
+    line = f'  <url><loc>{escape(loc)}</loc>'
+    if lastmod:
+        line += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return line + '</url>\n'
+
+
+def index_entries():
+    """[(section, lastmod or None)] for every child sitemap, cached until a post changes."""
+    def build():
+        size = chunk_size()
+        chunks = (
+            Blog.objects.published()
+            .annotate(chunk=(F('id') - 1) / size)
+            .values('chunk')
+            .annotate(lastmod=Max('updated_at'))
+            .order_by('chunk')
+        )
+        entries = [('categories', Category.objects.aggregate(lastmod=Max('updated_at'))['lastmod'])]
+        entries += [(f"posts-{row['chunk']}", row['lastmod']) for row in chunks]
+        return entries
+
+    return cached('sitemap-index', [Blog, Category], build)
+
+
+def render_index(request):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+    for section, lastmod in index_entries():
+        loc = request.build_absolute_uri(reverse('sitemap_section', args=[section]))
+        line = f'  <sitemap><loc>{escape(loc)}</loc>'
+        if lastmod:
+            line += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+        lines.append(line + '</sitemap>\n')
+    lines.append('</sitemapindex>\n')
+    return ''.join(lines)
+
+
+def render_categories(request):
+    def build():
+        parts = [URLSET_HEAD, _url(request.build_absolute_uri(reverse('home')))]
+        for pk, updated_at in Category.objects.order_by('pk').values_list('pk', 'updated_at'):
+            parts.append(_url(request.build_absolute_uri(reverse('category_posts', args=[pk])), updated_at))
+        parts.append(URLSET_TAIL)
+        return ''.join(parts)
+
+    return cached(f'sitemap-categories:{request.get_host()}', [Category], build, SITEMAP_TIMEOUT)
+
+
+def render_chunk(request, chunk):
+    """The urlset for one chunk of post ids, cached until a post in it changes."""
+    version = get_versions(_chunk_version_name(chunk))[0]
+    key = f'bloggss:sitemap:posts-{chunk}:{request.get_host()}:{version}'
+    xml = cache.get(key)
+    if xml is None:
+        size = chunk_size()
+        rows = (
+            Blog.objects.published()
+            .filter(pk__gt=chunk * size, pk__lte=(chunk + 1) * size)
+            .order_by('pk')
+            .values_list('slug', 'updated_at')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        )
+        parts = [URLSET_HEAD]
+        for slug, updated_at in rows:
+            parts.append(_url(request.build_absolute_uri(reverse('single_blogs', args=[slug])), updated_at))
+        parts.append(URLSET_TAIL)
+        xml = ''.join(parts)
+        cache.set(key, xml, SITEMAP_TIMEOUT)
+    return xml
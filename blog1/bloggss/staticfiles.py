@@ -0,0 +1,148 @@
+"""
+Content-hashed, precompressed static files.
+
+`collectstatic` with CompressedManifestStaticFilesStorage (STORAGES in
+settings.py) writes css/blog.<hash>.css next to css/blog.css, like Django's
+ManifestStaticFilesStorage, and then a .gz (and a .br when the optional
+`brotli` package is installed) beside every hashed text asset. {% static %}
+always points at the hashed name, so a changed file is a new URL and the
+old one can be cached forever.
+
+serve_static() sends them when Django serves STATIC_URL itself
+(BLOG_SERVE_STATIC): the smallest encoding the browser accepts, and
+"immutable" one-year caching for hashed names. A front server can do the
+same with gzip_static/brotli_static and an `expires max` on hashed files.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import HttpResponseNotAllowed
+from django.urls import re_path
+from django.utils.cache import patch_vary_headers
+
+from . import media
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico')
+MIN_COMPRESS_SIZE = 256  # smaller files barely shrink
+# what serve_static() looks for, best first (a .br may come from another machine)
+SIBLINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+UNHASHED = 'public, max-age=300'
+
+# ManifestStaticFilesStorage names: name.<12 hex digits>.ext
+_HASHED = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def encoders():
+    """[(Content-Encoding, file suffix, compress function)], best first."""
+    found = []
+    if brotli is not None:
+        found.append(('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    found.append(('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+    return found
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed[hashed_name] = name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name, name in hashed.items():
+            for compressed_name in self.compress(hashed_name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Write the compressed siblings of `name` that are worth having. Returns their names."""
+        if not name.endswith(COMPRESSIBLE):
+            return []
+        path = self.path(name)
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for _, suffix, compress in encoders():
+            packed = compress(data)
+            if len(packed) >= len(data) * 0.95:
+                continue
+            # straight to disk: storage.save() would rename an existing file
+            with open(path + suffix, 'wb') as handle:
+                handle.write(packed)
+            written.append(name + suffix)
+        return written
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.hashed_files:
+                raise  # a manifest without this file: a missing or misspelled asset
+            # collectstatic hasn't run (tests, a fresh checkout): the plain
+            # name still resolves through the finders / serve_static
+            return name
+
+
+def static_urlpatterns():
+    """The STATIC_URL route for Blog/urls.py when Django serves static files."""
+    if not getattr(settings, 'BLOG_SERVE_STATIC', True):
+        return []
+    prefix = settings.STATIC_URL.lstrip('/')
+    return [re_path(rf'^{re.escape(prefix)}(?P<path>.+)$', serve_static, name='static')]
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue  # "gzip;q=0" means no gzip
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def is_hashed(path):
+    return bool(_HASHED.search(path))
+
+
+def serve_static(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    full_path = media.resolve(path, settings.STATIC_ROOT)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    served, encoding = full_path, None
+    accepted = accepted_encodings(request)
+    for coding, suffix in SIBLINGS:
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            served, encoding = full_path + suffix, coding
+            break
+
+    response = media.file_response(request, served, content_type)
+    if encoding and response.status_code in (200, 206):
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if response.status_code in (200, 206, 304):
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = IMMUTABLE if is_hashed(path) else UNHASHED
+    return response
@@ -0,0 +1,109 @@
+"""
+Daily post rollups (BlogDailyStats) for the system reports page.
+
+Rows are adjusted with F() expressions as posts are created, deleted or
+change status, so the report reads a few hundred small rows instead of
+counting the whole Blog table. `rebuild()` recomputes everything from
+scratch (manage.py rebuild_blog_stats) if the rollup ever drifts.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Blog, BlogDailyStats
+
+
+def day_of(created_at):
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def adjust(day, created=0, published=0):
+    """Add the deltas to the rollup row for `day`, creating it if needed."""
+    if not created and not published:
+        return
+    changes = {
+        'created_count': F('created_count') + created,
+        'published_count': F('published_count') + published,
+    }
+    if BlogDailyStats.objects.filter(day=day).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            BlogDailyStats.objects.create(day=day, created_count=created, published_count=published)
+    except IntegrityError:
+        # another request created the row first
+        BlogDailyStats.objects.filter(day=day).update(**changes)
+
+
+def is_published(status):
+    return status == 'published'
+
+
+def record_created(blog):
+    adjust(day_of(blog.created_at), created=1, published=int(is_published(blog.status)))
+
+
+def record_deleted(blog):
+    adjust(day_of(blog.created_at), created=-1, published=-int(is_published(blog.status)))
+
+
+def record_status_change(blog, old_status):
+    delta = int(is_published(blog.status)) - int(is_published(old_status))
+    adjust(day_of(blog.created_at), published=delta)
+
+
+# ---------- reading ----------
+
+def summary(recent_days=30):
+    """Total posts, posts created in the last `recent_days` and published posts, one query."""
+    since = timezone.localdate() - timedelta(days=recent_days)
+    totals = BlogDailyStats.objects.aggregate(
+        total=Sum('created_count'),
+        recent=Sum('created_count', filter=Q(day__gte=since)),
+        published=Sum('published_count'),
+    )
+    return totals['total'] or 0, totals['recent'] or 0, totals['published'] or 0
+
+
+def month_starts(months):
+    """The first day of each of the last `months` calendar months, oldest first."""
+    start = timezone.localdate().replace(day=1)
+    starts = [start]
+    for _ in range(months - 1):
+        start = (start - timedelta(days=1)).replace(day=1)
+        starts.append(start)
+    return starts[::-1]
+
+
+def monthly_counts(months=6):
+    """[(month_start, posts created)] for the last `months` months, one TruncMonth query."""
+    starts = month_starts(months)
+    rows = (
+        BlogDailyStats.objects.filter(day__gte=starts[0])
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(total=Sum('created_count'))
+        .order_by('month')
+    )
+    totals = {row['month']: row['total'] for row in rows}
+    return [(start, totals.get(start, 0)) for start in starts]
+
+
+def rebuild():
+    """Recompute every rollup row from the Blog table. Returns the row count."""
+    rows = (
+        Blog.objects.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(created=Count('id'), published=Count('id', filter=Q(status='published')))
+        .order_by()
+    )
+    with transaction.atomic():
+        BlogDailyStats.objects.all().delete()
+        BlogDailyStats.objects.bulk_create([
+            BlogDailyStats(day=row['day'], created_count=row['created'], published_count=row['published'])
+            for row in rows
+        ], batch_size=500)
+    return BlogDailyStats.objects.count()
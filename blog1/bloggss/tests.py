@@ -1,3 +1,1566 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from types import ModuleType
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from PIL import Image
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from assign.models import About, FollowUs
+from . import admin as blog_admin, autocomplete, category_counts, context_processors, counters, hits, images, media, moderation, related, sitemaps, stats
+from . import staticfiles as blog_staticfiles
+from .benchmark import seed_blogs, seed_categories, seed_users
+from .cache import bump_version, model_version_name
+from .management.commands import backfill_image_derivatives
+from .management.commands.load_test import compare
+from .models import Blog, BlogDailyStats, Category, Counter, RelatedBlog
+from .pagination import PREVIOUS, encode_cursor, keyset_paginate
+from .search import build_match_query, fts_available, search_blogs
+from .slugs import allocate_slugs, save_with_unique_slug
+
+
+def tearDownModule():
+    # don't leave page views for the atexit flush once the test database is gone
+    hits.discard()
+
+
+def make_blog(author, category, n, **kwargs):
+    fields = dict(
+        title=f"Post {n}", slug=f"post-{n}", content="Body", short_desc="Short",
+        category=category, author=author, blog_image='uploads/x.jpg', status='published',
+    )
+    fields.update(kwargs)
+    return Blog.objects.create(**fields)
+
+
+def sidebar_context():
+    request = RequestFactory().get('/')
+    context = {}
+    for processor in (context_processors.get_categories,
+                      context_processors.about_us,
+                      context_processors.get_follow_us):
+        context.update(processor(request))
+    return context
+
+
+def evaluate(context):
+    """Force the lazy sidebar values the way a template would."""
+    return (
+        [str(c) for c in context['categories']],
+        bool(context['abouts']) and context['abouts'].title,
+        [link.url for link in context['follow_us_links']],
+    )
+
+
+class SidebarCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(category_name="Python")
+        About.objects.create(title="About us", short_desc="A developer blog")
+        FollowUs.objects.create(platform='github', url='https://github.com/example')
+
+    def test_unused_sidebar_costs_nothing(self):
+        with self.assertNumQueries(0):
+            sidebar_context()
+
+    def test_warm_cache_makes_no_queries(self):
+        evaluate(sidebar_context())
+        with self.assertNumQueries(0):
+            categories, about, links = evaluate(sidebar_context())
+        self.assertEqual(categories, ["Python"])
+        self.assertEqual(about, "About us")
+        self.assertEqual(links, ['https://github.com/example'])
+
+    def test_save_and_delete_invalidate(self):
+        evaluate(sidebar_context())
+
+        Category.objects.create(category_name="Django")
+        with self.assertNumQueries(1):
+            categories, _, _ = evaluate(sidebar_context())
+        self.assertEqual(sorted(categories), ["Django", "Python"])
+
+        self.category.delete()
+        FollowUs.objects.all().delete()
+        categories, _, links = evaluate(sidebar_context())
+        self.assertEqual(categories, ["Django"])
+        self.assertEqual(links, [])
+
+    def test_missing_about_does_not_crash(self):
+        About.objects.all().delete()
+        self.assertFalse(sidebar_context()['abouts'])
+
+
+class CategoryPostCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("counter")
+        self.python = Category.objects.create(category_name="Python")
+        self.django = Category.objects.create(category_name="Django")
+        make_blog(self.author, self.python, 1)
+        make_blog(self.author, self.python, 2, status='draft')
+        make_blog(self.author, self.django, 3)
+
+    def post_counts(self):
+        return {str(c): c.post_count for c in sidebar_context()['aside_categories']}
+
+    def test_counted_in_one_query_then_cached(self):
+        cache.clear()
+        with self.assertNumQueries(2):  # categories + one grouped count
+            self.assertEqual(self.post_counts(), {"Python": 1, "Django": 1})
+        with self.assertNumQueries(0):
+            self.post_counts()
+
+    def test_signals_adjust_the_cached_counts(self):
+        self.post_counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Blog.objects.get(slug='post-2')
+            draft.status = 'published'
+            draft.save()
+            moved = Blog.objects.get(slug='post-3')
+            moved.category = self.python
+            moved.save()
+            Blog.objects.get(slug='post-1').delete()
+            Category.objects.create(category_name="Go")
+
+        with self.assertNumQueries(1):  # only the category list, its version was bumped
+            self.assertEqual(self.post_counts(), {"Python": 2, "Django": 0, "Go": 0})
+        self.assertEqual(category_counts.rebuild()[self.python.pk], 2)
+
+    def test_bulk_moderation_adjusts_the_counts(self):
+        self.post_counts()
+        ids = list(Blog.objects.values_list('pk', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.apply('unpublish', ids)
+        self.assertEqual(self.post_counts(), {"Python": 0, "Django": 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.apply('publish', ids)
+            moderation.apply('delete', [Blog.objects.get(slug='post-3').pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post_counts(), {"Python": 2, "Django": 0})
+
+    def test_nothing_changes_before_the_commit(self):
+        self.post_counts()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Blog.objects.get(slug='post-1').delete()
+        self.assertEqual(self.post_counts(), {"Python": 1, "Django": 1})  # rolled back: stays right
+        callbacks[0]()
+        self.assertEqual(self.post_counts(), {"Python": 0, "Django": 1})
+
+    def test_recount_racing_a_change_stores_nothing(self):
+        real_query = category_counts._counts_query
+
+        def count_then_commit_a_change():
+            rows = list(real_query())  # read before the change below commits
+            with self.captureOnCommitCallbacks(execute=True):
+                make_blog(self.author, self.django, 4)
+            return rows
+
+        with mock.patch.object(category_counts, '_counts_query', count_then_commit_a_change):
+            self.assertEqual(category_counts.rebuild()[self.django.pk], 1)
+        self.assertEqual(self.post_counts(), {"Python": 1, "Django": 2})  # recounted, not the stale 1
+
+    def test_aside_shows_the_counts(self):
+        response = self.client.get('/blogs/post-1/')
+        self.assertContains(response, '<span class="badge bg-secondary rounded-pill">1</span>', count=2)
+
+    def test_pages_without_the_aside_skip_the_counts(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/')
+        self.assertFalse([q for q in queries if 'COUNT' in q['sql']])
+
+
+class DailyStatsTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("writer")
+        self.category = Category.objects.create(category_name="Python")
+
+    def snapshot(self):
+        return list(BlogDailyStats.objects.order_by('day').values_list('day', 'created_count', 'published_count'))
+
+    def test_rollup_follows_creates_status_changes_and_deletes(self):
+        first = make_blog(self.author, self.category, 1)
+        second = make_blog(self.author, self.category, 2, status='draft')
+        make_blog(self.author, self.category, 3)
+
+        second.status = 'published'
+        second.save()
+        first.status = 'draft'
+        first.save()
+        Blog.objects.get(slug='post-3').delete()
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental[0][1:], (2, 1))
+        stats.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_report_reads_rollup(self):
+        make_blog(self.author, self.category, 1)
+        make_blog(self.author, self.category, 2, status='draft')
+        self.assertEqual(stats.summary(), (2, 2, 1))
+        monthly = stats.monthly_counts(months=6)
+        self.assertEqual(len(monthly), 6)
+        self.assertEqual(monthly[-1][1], 2)
+
+
+class CounterTests(TestCase):
+
+    def test_counters_follow_signals_and_reconcile(self):
+        names = (counters.BLOGS, counters.CATEGORIES, counters.USERS)
+        author = User.objects.create_user("writer")
+        category = Category.objects.create(category_name="Python")
+        make_blog(author, category, 1)
+        make_blog(author, category, 2)
+
+        self.assertEqual(counters.get_counts(*names), {'blogs': 2, 'categories': 1, 'users': 1})
+        with self.assertNumQueries(1):
+            counters.get_counts(*names)
+
+        Blog.objects.get(slug='post-1').delete()
+        self.assertEqual(counters.get_counts(counters.BLOGS)[counters.BLOGS], 1)
+
+        Counter.objects.filter(name=counters.BLOGS).update(value=40)
+        self.assertEqual(counters.reconcile(), {'blogs': (40, 1)})
+        self.assertEqual(counters.get_counts(*names), counters.get_counts(*names, exact=True))
+
+    def test_failed_counter_update_rolls_back_the_save(self):
+        manager = User.objects.create_user("boss")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        self.client.force_login(manager)
+        with mock.patch.object(counters, 'increment', side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.client.post('/users/categories/add/', {'category_name': "Rust"})
+        self.assertFalse(Category.objects.filter(category_name="Rust").exists())
+
+    def test_author_counters_follow_signals_and_reconcile(self):
+        first, second = User.objects.create_user("first"), User.objects.create_user("second")
+        category = Category.objects.create(category_name="Python")
+        moved = make_blog(first, category, 1)
+        make_blog(first, category, 2)
+        make_blog(second, category, 3)
+        self.assertEqual(counters.top_author(), (first.pk, 2))
+
+        moved.author = second
+        moved.save()
+        self.assertEqual(counters.top_author(), (second.pk, 2))
+        Blog.objects.filter(author=second).delete()
+        self.assertEqual(counters.top_author(), (first.pk, 1))
+
+        Counter.objects.filter(name=counters.author_posts(first.pk)).update(value=9)
+        Counter.objects.create(name=counters.author_posts(999), value=4)
+        self.assertEqual(counters.reconcile(), {
+            counters.author_posts(first.pk): (9, 1),
+            counters.author_posts(999): (4, 0),
+        })
+        self.assertEqual(counters.top_author(), (first.pk, 1))
+
+
+@skipUnless(connection.vendor == 'sqlite', "the FTS5 index is SQLite only")
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Dev")
+        cls.in_title = make_blog(cls.author, cls.category, 1, title="Django caching",
+                                 content="notes about a framework")
+        cls.in_body = make_blog(cls.author, cls.category, 2, title="Weekly notes",
+                                content="some <b>django</b> & friends")
+
+    def titles(self, keyword):
+        return [blog.title for blog in search_blogs(keyword)[:10]]
+
+    def test_title_hits_rank_first_and_last_word_is_a_prefix(self):
+        self.assertEqual(self.titles('django'), ["Django caching", "Weekly notes"])
+        self.assertEqual(self.titles('weekly no'), ["Weekly notes"])
+        self.assertEqual(search_blogs('django').count(), 2)
+
+    def test_triggers_follow_inserts_updates_and_deletes(self):
+        Blog.objects.filter(pk=self.in_title.pk).update(title="Flask caching")  # no signals, only triggers
+        self.assertEqual(self.titles('flask'), ["Flask caching"])
+        self.assertEqual(self.titles('django'), ["Weekly notes"])
+        make_blog(self.author, self.category, 3, title="Django again")
+        self.assertIn("Django again", self.titles('django'))
+        self.in_body.delete()
+        self.assertEqual(self.titles('django'), ["Django again"])
+
+    def test_snippet_is_escaped_with_the_match_highlighted(self):
+        [_, blog] = search_blogs('django')[:2]
+        self.assertIn('&lt;b&gt;<mark>django</mark>&lt;/b&gt; &amp; friends', blog.snippet)
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(build_match_query('dj"ango OR *'), '"dj" "ango" "OR"*')
+        self.assertEqual(build_match_query('"*'), '')
+        self.assertEqual(self.titles('"*'), [])
+        self.assertEqual(search_blogs(''), [])
+
+    def test_drafts_are_not_found(self):
+        make_blog(self.author, self.category, 3, title="Django draft", status='draft')
+        self.assertEqual(self.titles('django'), ["Django caching", "Weekly notes"])
+        self.assertEqual(search_blogs('draft').count(), 0)
+        with mock.patch('bloggss.search.fts_available', return_value=False):
+            self.assertEqual(search_blogs('draft').count(), 0)
+
+    def test_like_fallback_without_the_index(self):
+        with mock.patch('bloggss.search.fts_available', return_value=False):
+            results = search_blogs('FRIENDS')
+        self.assertEqual([blog.title for blog in results], ["Weekly notes"])
+        self.assertContains(self.client.get('/search/', {'keyword': 'caching'}), "Django caching")
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("writer")
+        category = Category.objects.create(category_name="Dev")
+        cls.posts = [make_blog(author, category, n) for n in range(7)]
+        # three posts share one updated_at: the id breaks the tie
+        same = cls.posts[2].updated_at
+        Blog.objects.filter(pk__in=[p.pk for p in cls.posts[2:5]]).update(updated_at=same)
+
+    def queryset(self):
+        return Blog.objects.published()
+
+    def expected(self):
+        return list(self.queryset().order_by('-updated_at', '-id').values_list('pk', flat=True))
+
+    def test_next_and_previous_walk_every_post_once(self):
+        pages = [keyset_paginate(self.queryset(), None, 2)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(self.queryset(), pages[-1].next_cursor, 2))
+        self.assertEqual([blog.pk for page in pages for blog in page], self.expected())
+        self.assertEqual(len(pages), 4)
+        self.assertFalse(pages[0].has_previous)
+
+        # and back again from the last page
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(keyset_paginate(self.queryset(), back[-1].prev_cursor, 2))
+        self.assertEqual([[b.pk for b in page] for page in reversed(back)],
+                         [[b.pk for b in page] for page in pages])
+
+    def test_garbled_cursors_give_the_first_page(self):
+        first = [blog.pk for blog in keyset_paginate(self.queryset(), None, 3)]
+        for cursor in ('garbage', '%%%', encode_cursor('x', self.posts[0]), 'bnwxfDE='):
+            self.assertEqual([blog.pk for blog in keyset_paginate(self.queryset(), cursor, 3)], first)
+        self.assertEqual(self.client.get('/', {'cursor': 'garbage'}).status_code, 200)
+
+    def test_previous_past_the_start_gives_the_first_page(self):
+        newest = self.queryset().order_by('-updated_at', '-id').first()
+        page = keyset_paginate(self.queryset(), encode_cursor(PREVIOUS, newest), 3)
+        self.assertEqual(page.object_list[0].pk, newest.pk)
+        self.assertFalse(page.has_previous)
+
+
+class ImagePipelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Photos")
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, BLOG_IMAGE_WIDTHS=(480, 960, 1440))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(media_root.name, 'uploads'))
+        Image.new('RGB', (1000, 500), 'teal').save(os.path.join(media_root.name, 'uploads', 'photo.jpg'))
+
+    def photo_post(self, n, **kwargs):
+        return make_blog(self.author, self.category, n, blog_image='uploads/photo.jpg', **kwargs)
+
+    def test_derivatives_at_each_width_without_upscaling(self):
+        result = images.build_derivatives('uploads/photo.jpg', settings.MEDIA_ROOT, images.widths())
+        self.assertEqual((result['width'], result['height']), (1000, 500))
+        self.assertEqual([(v['width'], v['height']) for v in result['variants']], [(480, 240), (960, 480), (1000, 500)])
+        for variant in result['variants']:
+            for fmt in ('jpeg', 'webp'):
+                with Image.open(os.path.join(settings.MEDIA_ROOT, variant[fmt])) as image:
+                    self.assertEqual(image.size, (variant['width'], variant['height']))
+        self.assertEqual(result['variants'][0]['jpeg'], 'derived/uploads/photo-480w.jpg')
+
+    def test_stale_result_does_not_overwrite_a_newer_upload(self):
+        blog = make_blog(self.author, self.category, 1, blog_image='uploads/newer.jpg')
+        result = {'width': 1000, 'height': 500, 'variants': []}
+        images.save_result(blog.pk, 'uploads/photo.jpg', result)
+        blog.refresh_from_db()
+        self.assertIsNone(blog.image_width)
+        images.save_result(blog.pk, 'uploads/newer.jpg', result)
+        blog.refresh_from_db()
+        self.assertEqual((blog.image_width, blog.image_height), (1000, 500))
+
+    def test_srcset_lists_every_variant(self):
+        blog = self.photo_post(1)
+        images.save_result(blog.pk, 'uploads/photo.jpg',
+                           images.build_derivatives('uploads/photo.jpg', settings.MEDIA_ROOT, (480,)))
+        blog.refresh_from_db()
+        self.assertEqual(blog.image_srcset, "/media/derived/uploads/photo-480w.jpg 480w, "
+                                            "/media/derived/uploads/photo-1000w.jpg 1000w")
+        self.assertTrue(blog.image_srcset_webp.endswith("photo-1000w.webp 1000w"))
+        self.assertContains(self.client.get('/blogs/post-1/'), f'srcset="{blog.image_srcset}"')
+
+    @override_settings(BLOG_IMAGE_PIPELINE='sync')
+    def test_sync_mode_runs_after_commit(self):
+        blog = self.photo_post(1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            images.schedule(blog)
+            blog.refresh_from_db()
+            self.assertIsNone(blog.image_width)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        blog.refresh_from_db()
+        self.assertEqual((blog.image_width, len(blog.image_variants)), (1000, 3))
+
+        with override_settings(BLOG_IMAGE_PIPELINE='off'), self.captureOnCommitCallbacks() as callbacks:
+            images.schedule(blog)
+        self.assertEqual(callbacks, [])
+
+    def test_backfill_keeps_a_bounded_number_of_images_queued(self):
+        posts = [self.photo_post(n) for n in range(10)]
+        make_blog(self.author, self.category, 10, blog_image='uploads/missing.jpg')
+        queued = []
+        stored = mock.patch.object(images, 'save_result', wraps=images.save_result)
+
+        class Pool(ThreadPoolExecutor):
+            def submit(self, *args):
+                queued.append(len(queued) - saved.call_count)  # submitted and not yet collected
+                return super().submit(*args)
+
+        stderr = StringIO()
+        with stored as saved, mock.patch.object(backfill_image_derivatives, 'ProcessPoolExecutor', Pool):
+            call_command('backfill_image_derivatives', workers=1, chunk_size=3, stdout=StringIO(), stderr=stderr)
+
+        self.assertEqual(len(queued), 11)
+        self.assertLessEqual(max(queued), backfill_image_derivatives.PENDING_PER_WORKER - 1)
+        self.assertEqual(Blog.objects.filter(pk__in=[p.pk for p in posts], image_width=1000).count(), 10)
+        self.assertIn('uploads/missing.jpg', stderr.getvalue())
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite specific")
+class QueryPlanTests(TestCase):
+    """
+    Run the public/dashboard views, EXPLAIN every query they send to
+    bloggss_blog and fail on a full table scan or a temporary sort.
+    Walking an index in order ("SCAN ... USING INDEX") is fine.
+    """
+    BAD_PLAN = re.compile(r'^SCAN (TABLE )?bloggss_blog$|USE TEMP B-TREE')
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("writer")
+        category = Category.objects.create(category_name="Python")
+        cls.category = category
+        for n in range(25):
+            make_blog(author, category, n, is_featured=(n % 5 == 0), content=f"django tips {n}")
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+
+    def setUp(self):
+        cache.clear()  # the page caches would hide the queries
+
+    def plans_for(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        for query in queries.captured_queries:
+            if 'bloggss_blog' not in query['sql'] or not query['sql'].startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((query['sql'], [row[-1] for row in cursor.fetchall()]))
+        self.assertTrue(plans, f"{url} didn't query bloggss_blog")
+        return response, plans
+
+    def assertIndexed(self, url, data=None):
+        response, plans = self.plans_for(url, data)
+        for sql, steps in plans:
+            bad = [step for step in steps if self.BAD_PLAN.search(step)]
+            self.assertFalse(bad, f"{url}: {bad}\n{sql}")
+        return response
+
+    def test_home_feed(self):
+        response = self.assertIndexed('/')
+        older = self.assertIndexed('/', {'cursor': response.context['page'].next_cursor})
+        self.assertIndexed('/', {'cursor': older.context['page'].prev_cursor})
+
+    def test_category_feed(self):
+        response = self.assertIndexed(f'/category/{self.category.pk}/')
+        self.assertIndexed(f'/category/{self.category.pk}/', {'cursor': response.context['page'].next_cursor})
+
+    def test_search(self):
+        self.assertIndexed('/search/', {'keyword': 'django'})
+
+    def test_posts_list(self):
+        self.client.force_login(self.manager)
+        self.assertIndexed('/users/posts/')
+
+
+class SinglePostCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.post = make_blog(User.objects.create_user("writer"), Category.objects.create(category_name="Python"), 1)
+        self.url = f'/blogs/{self.post.slug}/'
+
+    def test_conditional_get_returns_304_without_rendering(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first.headers)
+
+        with self.assertNumQueries(0), self.assertTemplateNotUsed('single_blogs.html'):
+            response = self.client.get(self.url, headers={'if-none-match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_warm_hit_skips_orm_and_templates(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0), self.assertTemplateNotUsed('single_blogs.html'):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+    def test_edit_changes_etag_and_page(self):
+        first = self.client.get(self.url)
+        self.post.title = "Renamed post"
+        self.post.save()
+
+        response = self.client.get(self.url, headers={'if-none-match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Renamed post")
+
+    def test_unpublished_post_is_404(self):
+        self.client.get(self.url)
+        self.post.status = 'draft'
+        self.post.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class HomePageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("writer")
+        self.category = Category.objects.create(category_name="Python")
+        make_blog(self.author, self.category, 1)
+
+    def test_anonymous_hits_are_served_from_cache(self):
+        self.assertEqual(self.client.get('/').headers['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertEqual(response.headers['X-Page-Cache'], 'hit')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.force_login(self.author)
+        self.client.get('/')
+        self.assertNotIn('X-Page-Cache', self.client.get('/').headers)
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        self.client.get('/')
+        make_blog(self.author, self.category, 2, title="Brand new post")
+
+        refreshes = []
+        with mock.patch('bloggss.page_cache.start_refresh', refreshes.append):
+            first = self.client.get('/')
+            second = self.client.get('/')
+        self.assertEqual(first.headers['X-Page-Cache'], 'stale')
+        self.assertNotContains(first, "Brand new post")
+        self.assertEqual(second.headers['X-Page-Cache'], 'stale')
+        self.assertEqual(len(refreshes), 1)  # only one request rebuilds
+
+        refreshes[0]()
+        response = self.client.get('/')
+        self.assertEqual(response.headers['X-Page-Cache'], 'hit')
+        self.assertContains(response, "Brand new post")
+
+    def test_unused_query_parameters_share_the_entry(self):
+        self.client.get('/')
+        for query in ({'utm_source': 'feed'}, {'_': '12345'}):
+            self.assertEqual(self.client.get('/', query).headers['X-Page-Cache'], 'hit')
+        # the cursor picks a different page, so it gets its own entry
+        self.assertEqual(self.client.get('/', {'cursor': 'abc'}).headers['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/', {'cursor': 'abc', 'utm_source': 'x'}).headers['X-Page-Cache'], 'hit')
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Each listing/detail view must run a fixed number of queries no matter
+    how many posts (with different authors and categories) it shows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(category_name=f"Category {n}") for n in range(3)]
+        for n in range(12):
+            author = User.objects.create_user(f"writer{n}")
+            make_blog(author, categories[n % 3], n, content=f"django content {n}", is_featured=(n < 3))
+        cls.category = categories[0]
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        About.objects.create(title="About us", short_desc="A developer blog")
+
+    def setUp(self):
+        cache.clear()
+
+    def assertBudget(self, budget, url, data=None):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_home(self):
+        # featured + feed page + categories, about, follow us
+        self.assertBudget(5, '/')
+
+    def test_category_posts(self):
+        # category + feed page + categories
+        self.assertBudget(3, f'/category/{self.category.pk}/')
+
+    def test_search(self):
+        fts_available()  # the one-off sqlite_master check is cached per connection
+        # FTS count + FTS page + posts + categories, category counts, about
+        self.assertBudget(6, '/search/', {'keyword': 'django'})
+
+    def test_single_blogs(self):
+        # post meta + post (with author/category) + related posts + categories, category counts, about
+        self.assertBudget(6, '/blogs/post-1/')
+
+    def test_posts_list(self):
+        self.client.force_login(self.manager)
+        self.client.get('/users/posts/')
+        # session + user + roles + posts (categories were cached by the first request)
+        self.assertBudget(4, '/users/posts/')
+        with self.settings(USER_ROLES_SESSION_CACHE=True):
+            self.client.get('/users/posts/')  # roles get stored in the session
+            self.assertBudget(3, '/users/posts/')
+
+    def test_system_reports_cost_does_not_grow_with_the_posts(self):
+        self.client.force_login(self.manager)
+        self.client.get('/users/reports/')  # fills the category counts
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/users/reports/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(12, 15):
+                make_blog(self.manager, self.category, n)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/users/reports/')
+
+        self.assertEqual(len(after), len(before))
+        self.assertFalse([q['sql'] for q in after if 'GROUP BY' in q['sql'] and '"bloggss_blog"' in q['sql']])
+        self.assertEqual(response.context['most_active_author'], {'author__username': 'boss', 'post_count': 3})
+        self.assertEqual(response.context['category_labels'][0], "Category 0")
+        self.assertEqual(response.context['category_counts'], [7, 4, 4])
+
+
+class SlugTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+
+    def test_allocate_slugs_avoids_existing_and_batch_duplicates(self):
+        make_blog(self.author, self.category, 1, slug='hello-world')
+        make_blog(self.author, self.category, 2, slug='hello-world-2')
+        self.assertEqual(
+            allocate_slugs(['Hello world', 'Hello World!', 'Other', '!!!']),
+            ['hello-world-3', 'hello-world-4', 'other', 'post'],
+        )
+
+    def test_allocate_slugs_past_nine_duplicates(self):
+        for n in range(1, 10):
+            make_blog(self.author, self.category, n, slug='same' if n == 1 else f'same-{n}')
+        self.assertEqual(allocate_slugs(['Same', 'Same']), ['same-10', 'same-11'])
+
+    def test_new_post_is_a_single_insert(self):
+        blog = Blog(title="My first post", content="Body", short_desc="Short",
+                    category=self.category, author=self.author, blog_image='uploads/x.jpg')
+        with CaptureQueriesContext(connection) as queries:
+            save_with_unique_slug(blog)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT INTO "bloggss_blog"', 'UPDATE "bloggss_blog"'))]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(Blog.objects.get(pk=blog.pk).slug, 'my-first-post')
+
+
+class ImportBlogsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("archivist")
+
+    def setUp(self):
+        cache.clear()
+        counters.get_counts(counters.BLOGS)  # seed the counter so the import has to bump it
+
+    def run_import(self, text, suffix, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as handle:
+            handle.write(text)
+        self.addCleanup(os.unlink, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_blogs', handle.name, '--author', 'archivist', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import(self):
+        rows = [
+            {'title': 'Archive post', 'content': 'searchable archive text', 'category': 'Old',
+             'status': 'published', 'created_at': '2020-05-01T10:00:00'},
+            {'title': 'Archive post', 'content': 'Second one', 'category': 'Old', 'status': 'published'},
+            {'title': 'Draft', 'content': 'Not yet', 'category': 'New', 'is_featured': True},
+            {'title': '', 'content': 'No title'},
+        ]
+        text = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        out, err = self.run_import(text, '.jsonl', '--batch-size', '2', '--transaction-size', '3')
+
+        self.assertIn('Imported 3 posts', out)
+        self.assertIn('line 4', err)
+        self.assertIn('line 5', err)
+        self.assertEqual(
+            sorted(Blog.objects.values_list('slug', flat=True)),
+            ['archive-post', 'archive-post-2', 'draft'],
+        )
+        first = Blog.objects.get(slug='archive-post')
+        self.assertEqual((first.created_at.year, first.updated_at), (2020, first.created_at))
+        self.assertTrue(first.content_html.startswith('<p>'))
+        self.assertTrue(Blog.objects.get(slug='draft').is_featured)
+        self.assertEqual(Category.objects.count(), 2)
+
+        # the bulk signal kept the rollups and counters in step
+        self.assertEqual(stats.summary()[0], 3)
+        self.assertEqual(BlogDailyStats.objects.get(day=first.created_at.date()).published_count, 1)
+        self.assertEqual(counters.get_counts(counters.BLOGS), {counters.BLOGS: 3})
+
+    def test_rows_of_the_wrong_shape_are_reported(self):
+        rows = [
+            ['not', 'an', 'object'],
+            'a string',
+            {'title': 42, 'content': 'x', 'category': 'Old'},
+            {'title': 'Dated', 'content': 'x', 'category': 'Old', 'created_at': 20200501},
+            {'title': 'Listed', 'content': 'x', 'category': ['Old']},
+            {'title': 'Fine', 'content': 'x', 'category': 'Old'},
+        ]
+        out, err = self.run_import('\n'.join(json.dumps(row) for row in rows), '.jsonl')
+        self.assertIn('Imported 1 posts', out)
+        self.assertIn('5 skipped', out)
+        for line_no in range(1, 6):
+            self.assertIn(f'line {line_no}:', err)
+        self.assertIn('title must be a string, not int', err)
+
+    def test_csv_import(self):
+        text = "title,content,category,status\nFrom CSV,Some text,Csv,published\n"
+        out, _ = self.run_import(text, '.csv')
+        self.assertIn('Imported 1 posts', out)
+        self.assertEqual(Blog.objects.get().slug, 'from-csv')
+
+    @skipUnless(connection.vendor == 'sqlite', "FTS5 search is SQLite only")
+    def test_imported_posts_are_searchable(self):
+        self.run_import(json.dumps({'title': 'Zebra', 'content': 'stripes', 'category': 'Animals',
+                                    'status': 'published'}), '.jsonl')
+        self.assertEqual([blog.title for blog in search_blogs('stripes')], ['Zebra'])
+
+
+class AutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django Tips")
+        make_blog(cls.author, cls.category, 1, title="Intro to Django")
+        make_blog(cls.author, cls.category, 2, title="Django signals", status='draft')
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index.invalidate()
+
+    def labels(self, prefix):
+        return [item['label'] for item in autocomplete.suggest(prefix)]
+
+    def test_prefix_and_word_matches(self):
+        self.assertEqual(self.labels('dja'), ['Django Tips', 'Intro to Django'])
+        self.assertEqual(self.labels('INTRO t'), ['Intro to Django'])
+        self.assertEqual(self.labels('d'), [])
+
+    def test_lookups_do_not_query_once_built(self):
+        self.labels('dja')
+        with self.assertNumQueries(0):
+            self.labels('djan')
+            self.client.get('/search/suggest/', {'q': 'intro'})
+
+    def test_signals_update_the_index_in_place(self):
+        self.labels('dja')
+        draft = Blog.objects.get(slug='post-2')
+        draft.status = 'published'
+        draft.save()
+        Category.objects.create(category_name="Deployment")
+        Blog.objects.get(slug='post-1').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels('de'), ['Deployment'])
+            self.assertEqual(self.labels('django'), ['Django signals', 'Django Tips'])
+
+    def test_change_from_another_process_rebuilds(self):
+        self.labels('dja')
+        Blog.objects.filter(slug='post-2').update(status='published')
+        bump_version(model_version_name(Blog))
+        self.assertIn('Django signals', self.labels('dja'))
+
+    def test_local_change_does_not_hide_another_process_change(self):
+        self.labels('dja')
+        # another worker publishes post-2, then this one adds a category
+        Blog.objects.filter(slug='post-2').update(status='published')
+        bump_version(model_version_name(Blog))
+        Category.objects.create(category_name="Deployment")
+        self.assertIsNone(autocomplete.index.versions)
+        self.assertIn('Django signals', self.labels('dja'))
+        self.assertEqual(self.labels('de'), ['Deployment'])
+
+    def test_endpoint(self):
+        response = self.client.get('/search/suggest/', {'q': 'intro'})
+        self.assertEqual(response.json(), {'results': [
+            {'label': 'Intro to Django', 'type': 'post', 'url': '/blogs/post-1/'},
+        ]})
+
+
+def async_urlconf():
+    from Blog.urls import get_urlpatterns
+
+    urlconf = ModuleType('async_urls')
+    urlconf.urlpatterns = get_urlpatterns(use_async=True)
+    return urlconf
+
+
+@override_settings(ROOT_URLCONF=async_urlconf())
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+        for n in range(12):
+            make_blog(cls.author, cls.category, n, content=f"async content {n}", is_featured=(n == 0))
+        About.objects.create(title="About us", short_desc="A developer blog")
+        cls.manager = User.objects.create_user("boss")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_home(self):
+        response = await self.async_client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Post 0')   # featured
+        self.assertContains(response, 'Post 11')  # newest in the feed
+        self.assertContains(response, 'About us')  # sidebar
+        self.assertTrue(response.context['page'].has_next)
+
+        response = await self.async_client.get('/', {'cursor': response.context['page'].next_cursor})
+        self.assertContains(response, 'Post 1')
+
+        response = await self.async_client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    async def test_category_posts(self):
+        response = await self.async_client.get(f'/category/{self.category.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['posts']), 10)
+        response = await self.async_client.get('/category/999/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_search(self):
+        response = await self.async_client.get('/search/', {'keyword': 'async'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['blogs']), 10)
+        response = await self.async_client.get('/search/', {'keyword': 'async', 'page': 2})
+        self.assertEqual(len(response.context['blogs']), 2)
+
+    async def test_single_blogs_conditional_get(self):
+        response = await self.async_client.get('/blogs/post-3/')
+        self.assertContains(response, 'async content 3')
+        response = await self.async_client.get('/blogs/post-3/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get('/blogs/missing/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_logged_in_header(self):
+        await self.async_client.aforce_login(self.manager)
+        response = await self.async_client.get('/')
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, '/users/manager/dashboard/')
+
+
+@skipUnless(numpy, "build_related_posts needs NumPy")
+class RelatedPostsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Dev")
+        topics = {
+            'django': "django views models templates orm migrations",
+            'cooking': "pasta sauce garlic basil tomato oven",
+            'docker': "docker containers images compose volumes networks",
+        }
+        n = 0
+        for topic, words in topics.items():
+            for variant in range(3):
+                make_blog(cls.author, cls.category, n, title=f"{topic} notes {variant}",
+                          content=f"{words} {words.split()[variant]}")
+                n += 1
+
+    def related_titles(self, slug):
+        blog = Blog.objects.get(slug=slug)
+        return [b.title for b in Blog.objects.published().related_to(blog)]
+
+    def test_neighbours_share_a_topic(self):
+        self.assertEqual(related.refresh(k=2), 9)
+        self.assertEqual(sorted(self.related_titles('post-0')), ['django notes 1', 'django notes 2'])
+        self.assertEqual(sorted(self.related_titles('post-4')), ['cooking notes 0', 'cooking notes 2'])
+
+    def test_only_changed_posts_are_recomputed(self):
+        related.refresh(k=2)
+        self.assertEqual(related.refresh(k=2), 0)
+
+        # post-8 turns into a django post: its own list is rebuilt and the
+        # django posts pick it up
+        post = Blog.objects.get(slug='post-8')
+        post.title = "django notes 3"
+        post.content = "django views models templates orm migrations"
+        post.save()
+        self.assertGreater(related.refresh(k=2), 1)
+        self.assertEqual(len(self.related_titles('post-8')), 2)
+        self.assertTrue(all(title.startswith('django') for title in self.related_titles('post-8')))
+        self.assertIn('django notes 3', self.related_titles('post-0'))
+
+    def test_changed_post_leaves_its_old_neighbours_lists(self):
+        related.refresh(k=2)
+        self.assertIn('docker notes 2', self.related_titles('post-6'))
+
+        post = Blog.objects.get(slug='post-8')
+        post.title = "django notes 3"
+        post.content = "django views models templates orm migrations"
+        post.save()
+        related.refresh(k=2)
+        for slug in ('post-6', 'post-7'):
+            self.assertNotIn('django notes 3', self.related_titles(slug))
+            self.assertFalse(RelatedBlog.objects.filter(blog__slug=slug, related__slug='post-8').exists())
+
+    def test_post_page_shows_related_posts(self):
+        related.refresh(k=2)
+        response = self.client.get('/blogs/post-0/')
+        self.assertContains(response, 'Related posts')
+        self.assertContains(response, '/blogs/post-1/')
+        self.assertEqual(RelatedBlog.objects.filter(blog__slug='post-0').count(), 2)
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.django = Category.objects.create(category_name="Django")
+        cls.other = Category.objects.create(category_name="Other")
+        for n in range(6):
+            make_blog(cls.author, cls.django if n % 2 else cls.other, n)
+        make_blog(cls.author, cls.django, 99, status='draft')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        if response.status_code == 200:
+            self.assertTrue(response.streaming)
+            response.xml = ET.fromstring(b''.join(response.streaming_content))
+        return response
+
+    def test_rss(self):
+        response = self.get_feed('/feed/rss/')
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        titles = [item.findtext('title') for item in response.xml.iter('item')]
+        self.assertEqual(titles, [f"Post {n}" for n in range(5, -1, -1)])
+        self.assertTrue(response.xml.find('channel/item/link').text.endswith('/blogs/post-5/'))
+
+    def test_atom_category_feed(self):
+        response = self.get_feed(f'/category/{self.django.pk}/feed/atom/')
+        entries = response.xml.findall('{http://www.w3.org/2005/Atom}entry')
+        self.assertEqual([e.findtext('{http://www.w3.org/2005/Atom}title') for e in entries],
+                         ['Post 5', 'Post 3', 'Post 1'])
+        self.assertEqual(self.client.get('/category/999/feed/atom/').status_code, 404)
+        self.assertEqual(self.client.get('/feed/json/').status_code, 404)
+
+    def test_conditional_get_and_incremental_render(self):
+        response = self.get_feed('/feed/rss/')
+        with self.assertNumQueries(0):
+            again = self.get_feed('/feed/rss/', if_none_match=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        post = Blog.objects.get(slug='post-2')
+        post.title = "Post 2 edited"
+        post.save()
+
+        # new index + the one edited item, the other five come from the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_feed('/feed/rss/', if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.xml.findtext('channel/item/title'), "Post 2 edited")
+
+
+@override_settings(SITEMAP_CHUNK_SIZE=3)
+class SitemapTests(TestCase):
+    NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+        cls.posts = [make_blog(cls.author, cls.category, n) for n in range(7)]
+        cls.posts[1].status = 'draft'
+        cls.posts[1].save()
+
+    def setUp(self):
+        cache.clear()
+
+    def locs(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [loc.text for loc in ET.fromstring(response.content).iter(f'{self.NS}loc')]
+
+    def chunk_urls(self):
+        chunks = {}
+        for post in self.posts:
+            if post.status == 'published':
+                chunks.setdefault(sitemaps.chunk_of(post.pk), []).append(f'http://testserver/blogs/{post.slug}/')
+        return chunks
+
+    def test_index_lists_chunks(self):
+        self.assertEqual(
+            self.locs('/sitemap.xml'),
+            ['http://testserver/sitemap-categories.xml']
+            + [f'http://testserver/sitemap-posts-{chunk}.xml' for chunk in sorted(self.chunk_urls())],
+        )
+        self.assertIn(f'http://testserver/category/{self.category.pk}/', self.locs('/sitemap-categories.xml'))
+        self.assertEqual(self.client.get('/sitemap-nope.xml').status_code, 404)
+        for chunk in ('²', '-1', 'x', '9' * 30):
+            self.assertEqual(self.client.get(f'/sitemap-posts-{chunk}.xml').status_code, 404)
+
+    def test_chunks_hold_published_posts_by_id(self):
+        for chunk, urls in self.chunk_urls().items():
+            self.assertEqual(self.locs(f'/sitemap-posts-{chunk}.xml'), urls)
+        self.assertNotIn('http://testserver/blogs/post-1/', str(self.chunk_urls()))
+
+    def test_only_the_changed_chunk_is_rebuilt(self):
+        chunks = self.chunk_urls()
+        for chunk in chunks:
+            self.locs(f'/sitemap-posts-{chunk}.xml')
+
+        post = self.posts[4]
+        post.slug = 'renamed'
+        post.save()
+        changed = sitemaps.chunk_of(post.pk)
+
+        with self.assertNumQueries(0):
+            for chunk in chunks:
+                if chunk != changed:
+                    self.locs(f'/sitemap-posts-{chunk}.xml')
+        with self.assertNumQueries(1):
+            self.assertIn('http://testserver/blogs/renamed/', self.locs(f'/sitemap-posts-{changed}.xml'))
+
+
+@override_settings(BLOG_VIEWS_FLUSH_HITS=5, BLOG_VIEWS_FLUSH_INTERVAL=3600)
+class ViewCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+        cls.first = make_blog(cls.author, cls.category, 1)
+        cls.second = make_blog(cls.author, cls.category, 2)
+
+    def setUp(self):
+        cache.clear()
+        hits.discard()  # hits left over from other tests' posts
+
+    def views(self, blog):
+        return Blog.objects.values_list('views', flat=True).get(pk=blog.pk)
+
+    def test_hits_are_buffered_then_written_in_batches(self):
+        for _ in range(3):
+            self.client.get('/blogs/post-1/')
+        self.client.get('/blogs/post-2/')
+        self.assertEqual(self.views(self.first), 0)
+        self.assertEqual(hits.pending(), {self.first.pk: 3, self.second.pk: 1})
+
+        # the fifth hit flushes: one UPDATE per distinct count
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/blogs/post-2/')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "bloggss_blog"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual((self.views(self.first), self.views(self.second)), (3, 2))
+        self.assertEqual(hits.pending(), {})
+
+    def test_flush_does_not_touch_updated_at(self):
+        before = Blog.objects.get(pk=self.first.pk).updated_at
+        hits.record_hit(self.first.pk)
+        self.assertEqual(hits.flush(), 1)
+        self.assertEqual(Blog.objects.get(pk=self.first.pk).updated_at, before)
+
+    def test_dashboard_shows_counts(self):
+        manager = User.objects.create_user("boss")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        self.client.force_login(manager)
+        self.client.get('/blogs/post-1/')
+        response = self.client.get('/users/posts/')
+        self.assertContains(response, "1 view</small>")
+
+    def test_failed_flush_keeps_the_page_up_and_the_hits(self):
+        for _ in range(4):
+            self.client.get('/blogs/post-1/')
+        locked = mock.patch.object(Blog.objects, 'filter', side_effect=OperationalError("database is locked"))
+        with locked, self.assertLogs('bloggss.hits', 'WARNING'):
+            self.assertEqual(hits.try_flush(), 0)
+        self.assertEqual(hits.pending(), {self.first.pk: 4})
+
+        with mock.patch.object(hits, 'flush', side_effect=OperationalError("database is locked")):
+            with self.assertLogs('bloggss.hits', 'WARNING'):
+                response = self.client.get('/blogs/post-1/')  # the fifth hit is due to flush
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(hits.flush(), 5)
+        self.assertEqual(self.views(self.first), 5)
+
+
+class BlogAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name="Django")
+        cls.admin_user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.posts = [make_blog(cls.admin_user, cls.category, n) for n in range(5)]
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+        model_admin = blog_admin.admin.site._registry[Blog]
+        patcher = mock.patch.object(model_admin, 'list_per_page', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def changelist(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/bloggss/blog/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries]
+
+    def titles(self, response):
+        return [blog.title for blog in response.context['cl'].result_list]
+
+    def test_keyset_pages_newest_first_without_counting_the_table(self):
+        response, queries = self.changelist()
+        self.assertEqual(self.titles(response), ['Post 4', 'Post 3'])
+        self.assertFalse([sql for sql in queries if 'COUNT(*)' in sql and 'bloggss_blog' in sql])
+        self.assertFalse([sql for sql in queries if 'OFFSET' in sql])
+        self.assertContains(response, '5 Blogs')
+
+        cl = response.context['cl']
+        self.assertEqual(cl.next_cursor, self.posts[3].pk)
+        response, _ = self.changelist(after=cl.next_cursor)
+        self.assertEqual(self.titles(response), ['Post 2', 'Post 1'])
+        response, _ = self.changelist(after=response.context['cl'].next_cursor)
+        self.assertEqual(self.titles(response), ['Post 0'])
+        self.assertIsNone(response.context['cl'].next_cursor)
+        self.assertContains(response, 'Newest')
+
+    def test_sorting_by_a_column_uses_numbered_pages(self):
+        response, _ = self.changelist(o='1', p='2')
+        self.assertFalse(response.context['cl'].keyset)
+        self.assertEqual(self.titles(response), ['Post 2', 'Post 3'])
+
+    def test_filtered_count_is_capped(self):
+        with mock.patch.object(blog_admin, 'COUNT_LIMIT', 2):
+            response, _ = self.changelist(status__exact='published')
+        self.assertContains(response, '2+ Blogs')
+
+    def test_search_is_an_id_or_title_prefix(self):
+        response, _ = self.changelist(q='POST 3')
+        self.assertEqual(self.titles(response), ['Post 3'])
+        response, _ = self.changelist(q='ost')
+        self.assertEqual(self.titles(response), [])
+        response, _ = self.changelist(q=str(self.posts[1].pk))
+        self.assertIn('Post 1', self.titles(response))
+        for term in ('²', '9' * 30):
+            response, _ = self.changelist(q=term)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.titles(response), [])
+
+    def test_non_ascii_titles_are_found(self):
+        make_blog(self.admin_user, self.category, 9, title="Über Django")
+        response, _ = self.changelist(q='Über')
+        self.assertEqual(self.titles(response), ['Über Django'])
+        response, _ = self.changelist(q='Post 1\U0010ffff')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response), [])
+
+    def test_prefix_range_past_the_last_code_point(self):
+        top = chr(sys.maxunicode)
+        self.assertEqual(blog_admin.title_prefix('ab'), Q(title_lower__gte='ab', title_lower__lt='ac'))
+        self.assertEqual(blog_admin.title_prefix('a' + top), Q(title_lower__gte='a' + top, title_lower__lt='b'))
+        self.assertEqual(blog_admin.title_prefix(top), Q(title_lower__gte=top))
+
+    @skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite specific")
+    def test_search_uses_the_title_index(self):
+        _, queries = self.changelist(q='post')
+        sql = next(sql for sql in queries if 'LOWER' in sql and 'LIMIT' in sql)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('blog_title_lower_idx', plan)
+
+    @override_settings(BLOG_ADMIN_SCALABLE=False)
+    def test_stock_mode(self):
+        response, queries = self.changelist(p='2')
+        self.assertEqual(self.titles(response), ['Post 2', 'Post 1'])
+        self.assertTrue([sql for sql in queries if 'COUNT(*)' in sql])
+
+
+class BulkModerationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+        cls.drafts = [make_blog(cls.author, cls.category, n, status='draft') for n in range(3)]
+        cls.published = make_blog(cls.author, cls.category, 3)
+        cls.editor = User.objects.create_user("editor")
+        cls.editor.groups.add(Group.objects.create(name="Editor"))
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index.invalidate()
+        self.client.force_login(self.editor)
+
+    def bulk(self, action, posts):
+        return self.client.post('/users/posts/bulk/', {'action': action, 'selected': [p.pk for p in posts]})
+
+    def published_total(self):
+        return sum(BlogDailyStats.objects.values_list('published_count', flat=True))
+
+    def test_publish_is_one_update_and_one_invalidation(self):
+        autocomplete.suggest('post')  # build the index
+        before = self.published_total()
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch('bloggss.signals.bump_version', wraps=bump_version) as bumped:
+            response = self.bulk('publish', self.drafts + [self.published])
+        self.assertRedirects(response, '/users/posts/', fetch_redirect_response=False)
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "bloggss_blog"')]
+        self.assertEqual(len(updates), 1)
+        bumped.assert_called_once_with(model_version_name(Blog))
+        self.assertEqual(Blog.objects.filter(status='published').count(), 4)
+        self.assertEqual(self.published_total(), before + 3)
+        self.assertEqual(len(autocomplete.suggest('post')), 4)
+
+    def test_unfeature_leaves_untouched_posts_alone(self):
+        Blog.objects.filter(pk=self.published.pk).update(is_featured=True)
+        stamp = Blog.objects.get(pk=self.drafts[0].pk).updated_at
+        self.assertEqual(moderation.apply('unfeature', [self.published.pk, self.drafts[0].pk]), 1)
+        self.assertFalse(Blog.objects.get(pk=self.published.pk).is_featured)
+        self.assertEqual(Blog.objects.get(pk=self.drafts[0].pk).updated_at, stamp)
+
+    def test_delete_is_one_delete_and_keeps_the_rollups(self):
+        RelatedBlog.objects.create(blog=self.published, related=self.drafts[0], rank=0, score=0.5)
+        total = counters.get_counts(counters.BLOGS)[counters.BLOGS]
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk('delete', [self.drafts[0], self.published])
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "bloggss_blog"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(RelatedBlog.objects.exists())
+        self.assertEqual(counters.get_counts(counters.BLOGS)[counters.BLOGS], total - 2)
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(self.published_total(), 0)
+        rollup = list(BlogDailyStats.objects.values_list('day', 'created_count', 'published_count'))
+        stats.rebuild()
+        self.assertEqual(list(BlogDailyStats.objects.values_list('day', 'created_count', 'published_count')), rollup)
+
+    def test_needs_a_role_and_a_post(self):
+        self.client.force_login(self.author)
+        self.bulk('delete', self.drafts)
+        self.assertEqual(Blog.objects.count(), 4)
+        self.client.force_login(self.editor)
+        self.assertEqual(self.client.get('/users/posts/bulk/').status_code, 405)
+        self.bulk('explode', self.drafts)
+        self.assertEqual(Blog.objects.count(), 4)
+
+    def test_odd_ids_are_ignored(self):
+        response = self.client.post('/users/posts/bulk/', {'action': 'delete', 'selected': ['²', '9' * 30, 'x']})
+        self.assertRedirects(response, '/users/posts/', fetch_redirect_response=False)
+        self.assertEqual(Blog.objects.count(), 4)
+
+    def test_raw_delete_covers_every_reference_and_skips_the_signals(self):
+        referencing = {(rel.related_model, rel.field.name) for rel in Blog._meta.related_objects}
+        self.assertEqual(referencing, {(model, field) for model, fields in moderation.REFERENCING
+                                       for field in fields})
+
+        RelatedBlog.objects.create(blog=self.drafts[1], related=self.drafts[0], rank=0, score=0.5)
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.pk)
+        post_delete.connect(receiver, sender=Blog, weak=False)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Blog)
+        moderation.delete_rows([self.drafts[0].pk])
+        self.assertEqual(deleted, [])
+        self.assertFalse(Blog.objects.filter(pk=self.drafts[0].pk).exists())
+        self.assertFalse(RelatedBlog.objects.exists())
+
+
+class CompiledContentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("writer")
+        cls.category = Category.objects.create(category_name="Django")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_save_stores_the_rendered_fields(self):
+        words = ' '.join(['word'] * 401)
+        blog = make_blog(self.author, self.category, 1, content=f"<b>Hi</b>\n\n{words}",
+                         short_desc=' '.join(str(n) for n in range(30)))
+        blog.refresh_from_db()
+        self.assertEqual(blog.content_html, f"<p>&lt;b&gt;Hi&lt;/b&gt;</p>\n\n<p>{words}</p>")
+        self.assertEqual(blog.word_count, 402)
+        self.assertEqual(blog.reading_time, 3)
+        self.assertEqual(blog.excerpt, ' '.join(str(n) for n in range(20)) + ' …')
+
+        blog.content = "Short now"
+        blog.save(update_fields=['content'])
+        blog.refresh_from_db()
+        self.assertEqual((blog.content_html, blog.word_count, blog.reading_time), ("<p>Short now</p>", 2, 1))
+
+    def test_pages_print_the_stored_values(self):
+        make_blog(self.author, self.category, 1, content="Body text")
+        Blog.objects.update(content_html="<p>stored html</p>", excerpt="stored excerpt")
+        self.assertContains(self.client.get('/blogs/post-1/'), "<p>stored html</p>", html=True)
+        self.assertContains(self.client.get(f'/category/{self.category.pk}/'), "stored excerpt")
+
+    def test_backfill_fills_in_old_rows_without_touching_updated_at(self):
+        for n in range(3):
+            make_blog(self.author, self.category, n, content=f"Body {n}")
+        Blog.objects.update(content_html='', excerpt='', word_count=0, reading_time=0)
+        stamps = dict(Blog.objects.values_list('pk', 'updated_at'))
+
+        call_command('backfill_content', batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            sorted(Blog.objects.values_list('content_html', 'excerpt', 'word_count', 'reading_time')),
+            [(f"<p>Body {n}</p>", "Short", 2, 1) for n in range(3)],
+        )
+        self.assertEqual(dict(Blog.objects.values_list('pk', 'updated_at')), stamps)
+
+
+class CompileMigrationTests(TransactionTestCase):
+
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('bloggss', name)])
+        return executor.loader.project_state(('bloggss', name)).apps
+
+    def test_posts_from_before_the_fields_are_compiled(self):
+        old = self.migrate('0013_blog_compiled_content')
+        author = old.get_model('auth', 'User').objects.create(username="writer")
+        category = old.get_model('bloggss', 'Category').objects.create(category_name="Old")
+        # a historical model has no Blog.save(), like a row saved before 0013
+        old.get_model('bloggss', 'Blog').objects.create(
+            title="Old post", slug="old-post", content="Old body", short_desc="Old intro",
+            category=category, author=author, blog_image='uploads/x.jpg', status='published',
+        )
+        self.assertEqual(Blog.objects.get().content_html, '')
+
+        self.migrate('0014_compile_existing_posts')
+        blog = Blog.objects.get()
+        self.assertEqual((blog.content_html, blog.excerpt, blog.word_count), ("<p>Old body</p>", "Old intro", 2))
+        self.assertContains(self.client.get('/blogs/old-post/'), "<p>Old body</p>", html=True)
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        os.makedirs(os.path.join(media_root.name, 'uploads'))
+        with open(os.path.join(media_root.name, 'uploads', 'photo.jpg'), 'wb') as handle:
+            handle.write(b'0123456789')
+        with open(os.path.join(media_root.name, '.env'), 'wb') as handle:
+            handle.write(b'SECRET')
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, BLOG_MEDIA_SERVING='django')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get(self, **headers):
+        return self.client.get('/media/uploads/photo.jpg', headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file_with_validators(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'])
+
+    def test_ranges(self):
+        response = self.get(range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        self.assertEqual(self.body(self.get(range='bytes=-3')), b'789')
+        self.assertEqual(self.body(self.get(range='bytes=7-')), b'789')
+        self.assertEqual(self.body(self.get(range='bytes=0-1,4-5')), b'0123456789')
+
+        response = self.get(range='bytes=20-30')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        self.assertIs(media.parse_range('bytes=-10', 0), False)
+        self.assertIs(media.parse_range('bytes=0-', 0), False)
+        self.assertIsNone(media.parse_range(None, 0))
+
+    def test_conditional_requests(self):
+        etag, last_modified = self.get()['ETag'], self.get()['Last-Modified']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((response['ETag'], response['Last-Modified']), (etag, last_modified))
+        self.assertEqual(self.get(if_modified_since=last_modified).status_code, 304)
+        self.assertEqual(self.get(if_match='"other"').status_code, 412)
+        # a stale If-Range gets the whole (changed) file instead of a piece
+        self.assertEqual(self.get(range='bytes=0-1', if_range='"other"').status_code, 200)
+        self.assertEqual(self.get(range='bytes=0-1', if_range=etag).status_code, 206)
+
+    def test_range_file_starts_sendfile_at_the_offset(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'uploads', 'photo.jpg')
+        part = media.FileRange(open(path, 'rb'), 4, 3)
+        self.addCleanup(part.close)
+        self.assertEqual(os.lseek(part.fileno(), 0, os.SEEK_CUR), 4)
+        self.assertEqual(part.read(), b'456')
+        self.assertEqual(part.read(), b'')
+
+    def test_only_files_inside_media_root(self):
+        self.assertEqual(self.client.get('/media/.env').status_code, 404)
+        self.assertEqual(self.client.get('/media/uploads/../.env').status_code, 404)
+        self.assertEqual(self.client.get('/media/uploads/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.post('/media/uploads/photo.jpg').status_code, 405)
+
+    def test_proxy_modes_hand_off_the_bytes(self):
+        with override_settings(BLOG_MEDIA_SERVING='x-accel'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/photo.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        with override_settings(BLOG_MEDIA_SERVING='x-sendfile'):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'uploads', 'photo.jpg'))
+
+
+class StaticPipelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(static_root.cleanup)
+        settings_override = override_settings(STATIC_ROOT=static_root.name)
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        # once for the class: it compresses the admin's files too
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        url = static('css/blog.css')
+        self.assertRegex(url, r'^/static/css/blog\.[0-9a-f]{12}\.css$')
+        hashed = os.path.join(settings.STATIC_ROOT, url[len('/static/'):])
+        self.assertTrue(os.path.exists(hashed + '.gz'))
+        if blog_staticfiles.brotli is not None:
+            self.assertTrue(os.path.exists(hashed + '.br'))
+        self.assertContains(self.client.get('/'), url)
+
+    def test_serves_the_best_encoding_with_immutable_caching(self):
+        url = static('css/blog.css')
+        with open(os.path.join(settings.BASE_DIR, 'Blog', 'static', 'css', 'blog.css'), 'rb') as handle:
+            original = handle.read()
+
+        response = self.client.get(url, headers={'accept-encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], blog_staticfiles.IMMUTABLE)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+
+        response = self.client.get(url, headers={'accept-encoding': 'gzip;q=0'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), original)
+
+        if blog_staticfiles.brotli is not None:
+            response = self.client.get(url, headers={'accept-encoding': 'gzip, br'})
+            self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_missing_entry_raises_once_collected(self):
+        with self.assertRaisesMessage(ValueError, "Missing staticfiles manifest entry"):
+            static('css/no-such-file.css')
+
+    def test_unhashed_names_are_cached_briefly(self):
+        response = self.client.get('/static/css/blog.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], blog_staticfiles.UNHASHED)
+
+
+class LoadTestHarnessTests(TestCase):
+
+    def test_seeded_users_cover_every_role(self):
+        by_role = seed_users(40)
+        self.assertEqual({name: len(users) for name, users in by_role.items()},
+                         {'Manager': 2, 'Editor': 6, 'Author': 32})
+        self.assertEqual(Group.objects.get(name='Editor').user_set.count(), 6)
+        self.assertTrue(User.objects.get(username='bench-user-0').check_password('bench-password'))
+
+        writers = by_role['Author'] + by_role['Editor']
+        seed_blogs(30, categories=seed_categories(5), authors=writers)
+        self.assertGreater(Blog.objects.values('author').distinct().count(), 1)
+        self.assertFalse(Blog.objects.exclude(author__in=writers).exists())
+
+    def test_compare_lists_only_changed_numbers(self):
+        before = {'endpoints': {'home': {'p50_ms': 2.0, 'queries_warm': 3.0, 'errors': 0}}}
+        after = {'endpoints': {'home': {'p50_ms': 1.5, 'queries_warm': 3.0, 'errors': 0},
+                               'search': {'p50_ms': 9.0}}}
+        self.assertEqual(compare(before, after), {'home': {'p50_ms': (2.0, 1.5)}})
@@ -1,11 +1,23 @@
 from django.urls import  path
 from Blog import views as Blogsview
 from . import views
+from django.conf import settings
 
 
-urlpatterns = [
-    #path('', views.home, name='home'),
-    path('category/<int:pk>/', views.category_posts, name ='category_posts' ),
-    path('blogs/<slug:blog_slug>/', views.single_blogs, name='single_blogs'),
-    path('search/', Blogsview.search, name='search'),
-]
\ No newline at end of file
+def get_urlpatterns(use_async):
+    """use_async picks the async versions of the public read views."""
+    return [
+        #path('', views.home, name='home'),
+        path('category/<int:pk>/', views.acategory_posts if use_async else views.category_posts, name ='category_posts' ),
+        path('blogs/<slug:blog_slug>/', views.asingle_blogs if use_async else views.single_blogs, name='single_blogs'),
+        path('search/', Blogsview.asearch if use_async else Blogsview.search, name='search'),
+        path('search/suggest/', Blogsview.search_suggest, name='search_suggest'),
+        path('feed/<str:fmt>/', views.blog_feed, name='blog_feed'),
+        path('category/<int:pk>/feed/<str:fmt>/', views.blog_feed, name='category_feed'),
+        path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+        path('sitemap-posts-<int:chunk>.xml', views.sitemap_posts, name='sitemap_posts'),
+        path('sitemap-<str:section>.xml', views.sitemap_section, name='sitemap_section'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.BLOG_ASYNC_VIEWS)
@@ -1,25 +1,177 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from .models import Category, Blog 
+from .context_processors import acontext
+from .pagination import akeyset_paginate, keyset_paginate
+from . import feeds, hits, page_cache, sitemaps
 
 # Create your views here.
+POSTS_PER_PAGE = 10
+
+
 def category_posts(request, pk):
-    posts = Blog.objects.filter(category=pk, status='published').order_by('-updated_at')
     category = get_object_or_404(Category, pk=pk)
+    page = keyset_paginate(
+        Blog.objects.listing().published().filter(category=pk),
+        request.GET.get('cursor'),
+        POSTS_PER_PAGE,
+    )
 
     context = {
-        'posts': posts,
+        'posts': page.object_list,
+        'page': page,
         'category': category,
     }
 
     return render(request, 'category_posts.html', context)
 
 
+async def acategory_posts(request, pk):
+    try:
+        category = await Category.objects.aget(pk=pk)
+    except Category.DoesNotExist:
+        raise Http404("No such category")
+    page = await akeyset_paginate(
+        Blog.objects.listing().published().filter(category=pk),
+        request.GET.get('cursor'),
+        POSTS_PER_PAGE,
+    )
+
+    context = await acontext(request)
+    context.update({
+        'posts': page.object_list,
+        'page': page,
+        'category': category,
+    })
+    return render(request, 'category_posts.html', context)
+
+
 def single_blogs(request, blog_slug):
-    single_post = get_object_or_404(Blog, slug=blog_slug, status='published')
-    context = {
-        'single_post' : single_post
-    }
+    meta = page_cache.post_meta(blog_slug)
+    if meta is None:
+        raise Http404("No published post with that slug")
+    hits.hit(meta['id'])  # buffered, written in batches
+
+    # ETag/Last-Modified from the post (+ sidebar + who is looking), 304 if unchanged
+    page_key = page_cache.post_page_key(blog_slug, meta)
+    etag = quote_etag(hashlib.md5(f"{page_key}:{request.user.pk or 0}".encode()).hexdigest())
+    last_modified = int(meta['updated_at'].timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cacheable = page_cache.is_cacheable(request)
+        html = cache.get(page_key) if cacheable else None
+
+        if html is not None:
+            response = HttpResponse(html)
+        else:
+            single_post = get_object_or_404(Blog.objects.detail().published(), slug=blog_slug)
+            context = {
+                'single_post' : single_post,
+                # precomputed by manage.py build_related_posts, one indexed query
+                'related_posts': Blog.objects.listing().published().related_to(single_post),
+            }
+            response = render(request, 'single_blogs.html', context)
+            if cacheable:
+                cache.set(page_key, response.content, page_cache.PAGE_TIMEOUT)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+async def asingle_blogs(request, blog_slug):
+    """Async single_blogs(): same ETag/304 handling and cached HTML."""
+    meta = await page_cache.apost_meta(blog_slug)
+    if meta is None:
+        raise Http404("No published post with that slug")
+    if hits.record_hit(meta['id']):
+        await sync_to_async(hits.try_flush)()
+
+    user = await request.auser()
+    page_key = page_cache.post_page_key(blog_slug, meta, await page_cache.apage_tag())
+    etag = quote_etag(hashlib.md5(f"{page_key}:{user.pk or 0}".encode()).hexdigest())
+    last_modified = int(meta['updated_at'].timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cacheable = await page_cache.ais_cacheable(request)
+        html = await cache.aget(page_key) if cacheable else None
+
+        if html is not None:
+            response = HttpResponse(html)
+        else:
+            try:
+                single_post = await Blog.objects.detail().published().aget(slug=blog_slug)
+            except Blog.DoesNotExist:
+                raise Http404("No published post with that slug")
+            context = await acontext(request)
+            context['single_post'] = single_post
+            context['related_posts'] = [
+                blog async for blog in Blog.objects.listing().published().related_to(single_post).aiterator()
+            ]
+            response = render(request, 'single_blogs.html', context)
+            if cacheable:
+                await cache.aset(page_key, response.content, page_cache.PAGE_TIMEOUT)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def blog_feed(request, fmt, pk=None):
+    """RSS/Atom feed of all posts, or of one category (see feeds.py)."""
+    if fmt not in feeds.FORMATS:
+        raise Http404("Unknown feed format")
+    index = feeds.feed_index(pk)
+    if index is None:
+        raise Http404("No such category")
+
+    etag = quote_etag(feeds.feed_etag(fmt, pk, request.get_host()))
+    last_modified = int(index['items'][0][1].timestamp()) if index['items'] else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            feeds.stream_feed(fmt, index, request, pk),
+            content_type=f"{feeds.FORMATS[fmt].content_type}",
+        )
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=5 * 60)
+    return response
+
+
+def sitemap_index(request):
+    response = HttpResponse(sitemaps.render_index(request), content_type='application/xml')
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
+
 
-    return render(request, 'single_blogs.html', context)
+def sitemap_section(request, section):
+    """sitemap-categories.xml (the post chunks have their own route, sitemap_posts)."""
+    if section != 'categories':
+        raise Http404("No such sitemap")
+    response = HttpResponse(sitemaps.render_categories(request), content_type='application/xml')
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
 
 
+def sitemap_posts(request, chunk):
+    """sitemap-posts-<n>.xml: the published posts in id chunk n (see sitemaps.py)."""
+    if (chunk + 1) * sitemaps.chunk_size() >= 2 ** 63:
+        raise Http404("No such sitemap")  # past any id the database can hold
+    response = HttpResponse(sitemaps.render_chunk(request, chunk), content_type='application/xml')
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
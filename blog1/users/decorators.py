@@ -1,5 +1,6 @@
 from django.shortcuts import redirect
 from functools import wraps
+from .roles import has_role
 
 def group_required(*group_names):   # ⭐ Accept multiple groups
     def decorator(view_func):
@@ -9,7 +10,7 @@ def group_required(*group_names):   # ⭐ Accept multiple groups
             if not request.user.is_authenticated:
                 return redirect("login")
 
-            if not request.user.groups.filter(name__in=group_names).exists():
+            if not has_role(request.user, *group_names, request=request):
                 return redirect("home")
 
             return view_func(request, *args, **kwargs)
@@ -0,0 +1,115 @@
+"""
+Role (group) resolution for the dashboard permission checks.
+
+A user's group names are loaded with one query and then remembered on the
+user object, so every decorator, view and `in_group` template check in the
+same request shares that single query.
+
+With USER_ROLES_SESSION_CACHE on, the names are also kept in the session
+together with the role versions they were read at. Adding/removing groups
+(or renaming/deleting a group) bumps those versions - see signals.py - so a
+stale session copy is ignored and reloaded. The versions have to be the
+same in every worker for that, so it needs a shared cache (Redis or
+Memcached): it is off by default in settings.py.
+"""
+from django.conf import settings
+
+from bloggss.cache import bump_version, get_versions
+
+
+SESSION_KEY = '_user_roles'
+GROUPS_VERSION = 'auth.group'
+
+
+def user_version_name(user_id):
+    return f'auth.user.roles.{user_id}'
+
+
+def _current_versions(user):
+    return get_versions(GROUPS_VERSION, user_version_name(user.pk))
+
+
+def _roles_session(request):
+    if request is not None and getattr(settings, 'USER_ROLES_SESSION_CACHE', False):
+        return request.session
+    return None
+
+
+def _session_roles(user, session):
+    """(roles from the session or None, the current role versions)."""
+    if session is None:
+        return None, None
+    versions = _current_versions(user)
+    stored = session.get(SESSION_KEY)
+    if stored and stored.get('user') == user.pk and stored.get('versions') == versions:
+        return frozenset(stored['roles']), versions
+    return None, versions
+
+
+def _store_roles(user, roles, session, versions):
+    if session is not None:
+        session[SESSION_KEY] = {
+            'user': user.pk,
+            'versions': versions,
+            'roles': sorted(roles),
+        }
+
+
+def get_roles(user, request=None):
+    """Return the user's group names as a frozenset."""
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_role_names', None)
+    if roles is not None:
+        return roles
+
+    session = _roles_session(request)
+    roles, versions = _session_roles(user, session)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        _store_roles(user, roles, session, versions)
+
+    user._role_names = roles
+    return roles
+
+
+async def aget_roles(user, request=None):
+    """
+    get_roles() for async views. The session must already be loaded
+    (``await request.auser()`` does that), the groups query is async.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_role_names', None)
+    if roles is not None:
+        return roles
+
+    session = _roles_session(request)
+    roles, versions = _session_roles(user, session)
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        _store_roles(user, roles, session, versions)
+
+    user._role_names = roles
+    return roles
+
+
+def has_role(user, *group_names, request=None):
+    """True if the user belongs to any of the given groups."""
+    return not get_roles(user, request).isdisjoint(group_names)
+
+
+def forget_roles(user):
+    """Drop the per-request copy, e.g. right after changing the user's groups."""
+    if hasattr(user, '_role_names'):
+        del user._role_names
+
+
+def invalidate_user_roles(user_id):
+    bump_version(user_version_name(user_id))
+
+
+def invalidate_all_roles():
+    bump_version(GROUPS_VERSION)
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .roles import forget_roles, invalidate_all_roles, invalidate_user_roles
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        forget_roles(instance)
+        invalidate_user_roles(instance.pk)
+    elif pk_set:
+        # group.user_set.add/remove(...)
+        for user_id in pk_set:
+            invalidate_user_roles(user_id)
+    else:
+        # group.user_set.clear() doesn't tell us which users were affected
+        invalidate_all_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    invalidate_all_roles()
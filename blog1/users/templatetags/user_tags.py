@@ -3,10 +3,12 @@
 # Returns True if the user is in that group.
 
 from django import template
+from users.roles import has_role
 
 register = template.Library()
 
 @register.filter(name='in_group')
 def in_group(user, group_name):
     """Return True if the user is in the given group."""
-    return user.groups.filter(name=group_name).exists()
\ No newline at end of file
+    # roles are loaded once per request, so repeated checks are free
+    return has_role(user, group_name)
\ No newline at end of file
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from .roles import get_roles, has_role
+
+
+class RoleResolverTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = Group.objects.create(name="Manager")
+        self.editor = Group.objects.create(name="Editor")
+        self.user = User.objects.create_user("sam", password="pw-12345-xyz")
+        self.user.groups.add(self.editor)
+
+    def request_for(self, user, session):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=user.pk)  # fresh object per request
+        request.session = session
+        return request
+
+    def test_one_query_per_request(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(has_role(user, "Editor"))
+            self.assertFalse(has_role(user, "Manager"))
+            self.assertTrue(has_role(user, "Manager", "Editor"))
+
+    def test_session_cache_and_invalidation(self):
+        session = {}
+        with self.settings(USER_ROLES_SESSION_CACHE=True):
+            request = self.request_for(self.user, session)
+            get_roles(request.user, request)
+
+            request = self.request_for(self.user, session)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_roles(request.user, request), {"Editor"})
+
+            self.user.groups.add(self.manager)
+            request = self.request_for(self.user, session)
+            self.assertEqual(get_roles(request.user, request), {"Editor", "Manager"})
+
+            self.manager.user_set.remove(self.user)
+            request = self.request_for(self.user, session)
+            self.assertEqual(get_roles(request.user, request), {"Editor"})
+
+    def test_login_redirects_by_role(self):
+        response = self.client.post('/users/login/', {'username': 'sam', 'password': 'pw-12345-xyz'})
+        self.assertRedirects(response, '/users/editor/dashboard/', fetch_redirect_response=False)
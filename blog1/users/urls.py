@@ -12,6 +12,7 @@ urlpatterns = [
 
     #posts CRUD
     path('users/posts/', Blogsview.posts_list, name='posts_list'),
+    path('users/posts/bulk/', Blogsview.posts_bulk_action, name='posts_bulk_action'),
     path('users/posts/create/', Blogsview.post_create, name='post_create'),
     path('users/posts/<int:pk>/edit/', Blogsview.post_update, name='post_update'),
     path('users/posts/<int:pk>/delete/', Blogsview.post_delete, name='post_delete'),
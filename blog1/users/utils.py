@@ -1,3 +1,6 @@
 # users/utils.py
-def user_in_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
\ No newline at end of file
+from .roles import has_role
+
+
+def user_in_group(user, group_name, request=None):
+    return has_role(user, group_name, request=request)
\ No newline at end of file
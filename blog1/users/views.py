@@ -1,5 +1,7 @@
 from django.shortcuts import render, redirect
-from bloggss.models import Category, Blog
+from bloggss import counters
+from django.conf import settings
+from django.db import transaction
 from .utils import user_in_group 
 from .forms import RegisterForm
 from django.contrib import messages, auth
@@ -8,11 +10,13 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
 from .decorators import group_required
+from .roles import get_roles
 from django.contrib.auth import get_user_model
 
 
 
 # Create your views here.
+@transaction.atomic  # the user and the dashboard counter commit together
 def register(request):
     if request.method == "POST":
         form = RegisterForm(request.POST)
@@ -76,14 +80,15 @@ def login_view(request):
 
             messages.success(request, "Login successful 🎉")
 
-            # 🔥 ROLE-BASED REDIRECT
-            if user.groups.filter(name="Manager").exists():
+            # 🔥 ROLE-BASED REDIRECT (one query for all three checks)
+            roles = get_roles(user, request)
+            if "Manager" in roles:
                 return redirect("manager_dashboard")
 
-            elif user.groups.filter(name="Editor").exists():
+            elif "Editor" in roles:
                 return redirect("editor_dashboard")
 
-            elif user.groups.filter(name="Author").exists():
+            elif "Author" in roles:
                 return redirect("author_dashboard")
 
             else:
@@ -115,15 +120,16 @@ User = get_user_model()  # get the custom user model if you have one
 def manager_dashboard(request):
 
     # 2️⃣ Count total posts, categories, and users
-    posts_count = Blog.objects.count()
-    categories_count = Category.objects.count()
-    users_count = User.objects.count()
+    # Cached counters by default (one small query), ?exact=1 runs the real COUNT(*)s
+    exact = settings.DASHBOARD_EXACT_COUNTS or request.GET.get("exact") == "1"
+    counts = counters.get_counts(counters.BLOGS, counters.CATEGORIES, counters.USERS, exact=exact)
 
     # 3️⃣ Prepare the context dictionary to pass to the template
     context = {
-        "posts_count": posts_count,
-        "categories_count": categories_count,
-        "users_count": users_count,
+        "posts_count": counts[counters.BLOGS],
+        "categories_count": counts[counters.CATEGORIES],
+        "users_count": counts[counters.USERS],
+        "exact_counts": exact,
     }
 
     # 4️⃣ Render the template with the context